@@ -4,7 +4,7 @@ Video Automation Web UI
 User-friendly interface for AI video generation
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, session, redirect
+from flask import Flask, render_template, request, jsonify, send_file, session, redirect, Response, stream_with_context
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -12,11 +12,17 @@ import os
 import json
 from datetime import datetime, timedelta
 import threading
-from video_automation import VideoAutomation
+from video_automation import VideoAutomation, SCRIPT_PROMPT_VERSION
+from render_cache import get_render_cache
+from script_cache import get_script_cache
+from image_preparation import get_image_preparer
 from loguru import logger
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
-import requests
+from grok_client import get_grok_client
+from services import get_services
+from sheet_cache import get_sheet_cache
+from script_blobs import get_script_blobs
 import secrets
 from auth import setup_auth_routes, login_required, USE_AUTH
 
@@ -230,8 +236,8 @@ def clear_session():
 def get_topics():
     """Get topics from Google Sheets"""
     try:
-        automation = VideoAutomation(skip_external_setup=False)  # Keep Sheets setup for this endpoint
-        all_records = automation.topics_sheet.get_all_records()
+        # Sheets serves this from the worksheet snapshot while it is fresh
+        all_records = get_services().storage().list_topics()
         topics = [
             {
                 'id': record.get('ID'),
@@ -244,18 +250,20 @@ def get_topics():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/api/generate-script', methods=['POST'])
-def generate_script():
-    """Generate script only (for preview)"""
+def read_script_request():
+    """Script generation parameters from a multipart (with images) or JSON request"""
     # Handle both JSON and form data
     if request.content_type and 'multipart/form-data' in request.content_type:
-        topic = request.form.get('topic')
-        duration = int(request.form.get('duration', 8))
-        video_style = request.form.get('videoStyle', 'cinematic')
-        grok_api_key = request.form.get('grokApiKey')
+        params = {
+            'topic': request.form.get('topic'),
+            'duration': int(request.form.get('duration', 8)),
+            'video_style': request.form.get('videoStyle', 'cinematic'),
+            'grok_api_key': request.form.get('grokApiKey'),
+            'regenerate': request.form.get('regenerate') == 'true',
+            'image_paths': []
+        }
         
         # Handle image uploads for Grok analysis
-        image_paths = []
         if 'images' in request.files:
             images = request.files.getlist('images')
             os.makedirs('temp_images', exist_ok=True)
@@ -264,49 +272,74 @@ def generate_script():
                 if image and image.filename:
                     # Security: Validate file type
                     if not allowed_file(image.filename):
-                        return jsonify({'success': False, 'error': f'Invalid file type: {image.filename}. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'})
+                        raise ValueError(f'Invalid file type: {image.filename}. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}')
                     
                     filename = secure_filename(image.filename)
                     image_path = os.path.join('temp_images', f"grok_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}_{filename}")
                     image.save(image_path)
-                    image_paths.append(image_path)
+                    params['image_paths'].append(image_path)
     else:
         # JSON data (backward compatibility)
         data = request.json
-        topic = data.get('topic')
-        duration = data.get('duration', 8)
-        video_style = data.get('videoStyle', 'cinematic')
-        grok_api_key = data.get('grokApiKey')
-        image_paths = []
+        params = {
+            'topic': data.get('topic'),
+            'duration': int(data.get('duration', 8)),
+            'video_style': data.get('videoStyle', 'cinematic'),
+            'grok_api_key': data.get('grokApiKey'),
+            'regenerate': bool(data.get('regenerate')),
+            'image_paths': []
+        }
+    
+    params['num_segments'] = params['duration'] // 8
+    # Ensure API key has proper prefix
+    if params['grok_api_key'] and not params['grok_api_key'].startswith('xai-'):
+        params['grok_api_key'] = f"xai-{params['grok_api_key']}"
+    return params
+
+def script_cache_id(params):
+    """Script ID for the request - same topic/style/length/images map to the same cached script"""
+    image_hashes = [get_image_preparer().content_hash(path) for path in params['image_paths']]
+    return get_script_cache().script_id(
+        params['topic'], params['video_style'], params['num_segments'], image_hashes, SCRIPT_PROMPT_VERSION
+    )
+
+@app.route('/api/generate-script', methods=['POST'])
+def generate_script():
+    """Generate script only (for preview)"""
+    try:
+        params = read_script_request()
+    except (TypeError, ValueError) as e:
+        # Bad file types or a non-numeric duration - same error shape as every other failure
+        return jsonify({'success': False, 'error': str(e)})
+    
+    topic = params['topic']
+    video_style = params['video_style']
+    num_segments = params['num_segments']
+    image_paths = params['image_paths']
     
-    if not topic or not grok_api_key:
+    if not topic or not params['grok_api_key']:
         return jsonify({'success': False, 'error': 'Topic and API key required'})
     
     try:
+        # Same topic/style/length/images -> serve the cached script without calling Grok
+        script_cache = get_script_cache()
+        script_id = script_cache_id(params)
+        
+        cached_script = None if params['regenerate'] else script_cache.lookup(script_id)
+        if cached_script:
+            logger.info(f"Serving cached script {script_id[:12]} for topic: {topic}")
+            return jsonify({'success': True, 'script_data': cached_script, 'script_id': script_id, 'cached': True})
+        
         # Create temporary automation instance, skip external setup
         automation = VideoAutomation(skip_external_setup=True)
-        # Ensure API key has proper prefix
-        if not grok_api_key.startswith('xai-'):
-            grok_api_key = f"xai-{grok_api_key}"
-        automation.grok_api_key = grok_api_key
+        automation.grok_api_key = params['grok_api_key']
         
         # Generate script based on duration and style, with image analysis
-        num_segments = duration // 8
         if num_segments == 1:
             script_data = automation.generate_script(topic, style=video_style, image_paths=image_paths)
         else:
             script_data = automation.generate_multi_segment_script(topic, num_segments, style=video_style, image_paths=image_paths)
         
-        # Apply style-specific optimization only for missing fields
-        if hasattr(automation, 'prompt_optimizer') and 'visual_prompts' in script_data:
-            # Only update style_keywords if not already present
-            if 'style_keywords' not in script_data:
-                style_data = automation.prompt_optimizer.generate_style_prompt(
-                    script_data.get('visual_prompts', topic),
-                    style=video_style
-                )
-                script_data['style_keywords'] = style_data['style_keywords']
-        
         # Log what we're returning for debugging
         logger.info(f"Returning script_data keys: {list(script_data.keys())}")
         logger.info(f"visual_prompts exists: {'visual_prompts' in script_data}")
@@ -318,18 +351,101 @@ def generate_script():
         if 'visual_prompts' in script_data and isinstance(script_data['visual_prompts'], str):
             logger.info(f"visual_prompts preview: {script_data['visual_prompts'][:100]}...")
         
-        return jsonify({'success': True, 'script_data': script_data})
+        script_cache.store(script_id, script_data, topic, video_style, num_segments)
+        
+        return jsonify({'success': True, 'script_data': script_data, 'script_id': script_id, 'cached': False})
         
     except Exception as e:
         logger.error(f"Error generating script: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
+def sse_event(event, payload):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+# Fields the UI can expect, in prompt order, so it can show real progress as they stream in
+STREAMED_SCRIPT_FIELDS = ['title', 'description', 'script', 'visual_prompts', 'camera_work', 'lighting', 'style_keywords', 'hook']
+STREAMED_MULTI_SEGMENT_FIELDS = ['title', 'description', 'camera_work', 'lighting', 'style_keywords', 'segments']
+
+@app.route('/api/generate-script/stream', methods=['POST'])
+def generate_script_stream():
+    """Generate a script preview, streaming fields to the browser as Grok produces them"""
+    try:
+        params = read_script_request()
+    except (TypeError, ValueError) as e:
+        # Bad file types or a non-numeric duration - same error shape as every other failure
+        return jsonify({'success': False, 'error': str(e)})
+    
+    if not params['topic'] or not params['grok_api_key']:
+        return jsonify({'success': False, 'error': 'Topic and API key required'})
+    
+    def generate():
+        topic = params['topic']
+        video_style = params['video_style']
+        num_segments = params['num_segments']
+        try:
+            script_cache = get_script_cache()
+            script_id = script_cache_id(params)
+            
+            cached_script = None if params['regenerate'] else script_cache.lookup(script_id)
+            if cached_script:
+                logger.info(f"Serving cached script {script_id[:12]} for topic: {topic}")
+                yield sse_event('script', {'script_data': cached_script, 'script_id': script_id, 'cached': True})
+                return
+            
+            fields = STREAMED_SCRIPT_FIELDS if num_segments == 1 else STREAMED_MULTI_SEGMENT_FIELDS
+            yield sse_event('start', {'fields': fields, 'segments': num_segments})
+            
+            automation = VideoAutomation(skip_external_setup=True)
+            automation.grok_api_key = params['grok_api_key']
+            
+            for event in automation.stream_script(topic, num_segments, style=video_style, image_paths=params['image_paths']):
+                if event['event'] == 'field':
+                    yield sse_event('field', {'field': event['field'], 'value': event['value']})
+                elif event['event'] == 'segment':
+                    yield sse_event('segment', {'index': event['index'], 'value': event['value']})
+                else:
+                    script_data = event['script_data']
+                    script_cache.store(script_id, script_data, topic, video_style, num_segments)
+                    yield sse_event('script', {'script_data': script_data, 'script_id': script_id, 'cached': False})
+        except Exception as e:
+            logger.error(f"Error streaming script: {str(e)}")
+            yield sse_event('error', {'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        # Keep proxies from buffering the stream into one late response
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/script/<script_id>')
+def get_script(script_id):
+    """Get a previously generated script preview by ID"""
+    script_data = get_script_cache().lookup(script_id)
+    if not script_data:
+        return jsonify({'success': False, 'error': 'Script not found'})
+    
+    return jsonify({'success': True, 'script_id': script_id, 'script_data': script_data})
+
 @app.route('/api/generate-video', methods=['POST'])
 def generate_video_from_script():
     """Generate video from pre-generated script"""
     # Handle form data
     topic = request.form.get('topic')
-    script_data = json.loads(request.form.get('scriptData'))
+    script_id = request.form.get('scriptId')
+    if script_id:
+        # Script previews are kept server-side, so the client only sends its ID
+        script_data = get_script_cache().lookup(script_id)
+        if not script_data:
+            return jsonify({'success': False, 'error': 'Script preview expired, please generate the script again'})
+        # The preview lets users edit the prompt before rendering
+        if request.form.get('visualPrompts'):
+            script_data['visual_prompts'] = request.form.get('visualPrompts')
+    elif request.form.get('scriptData'):
+        script_data = json.loads(request.form.get('scriptData'))
+    else:
+        return jsonify({'success': False, 'error': 'Script data is required'})
     api_keys = {
         'grokApiKey': request.form.get('grokApiKey'),
         'falApiKey': request.form.get('falApiKey'),
@@ -521,13 +637,8 @@ def add_topic():
         return jsonify({'success': False, 'error': 'Topic is required'})
     
     try:
-        automation = VideoAutomation(skip_external_setup=False)  # Keep Sheets setup for adding topics
-        # Find next ID
-        records = automation.topics_sheet.get_all_records()
-        next_id = f"{len(records) + 1:03d}"
-        
-        # Add new row
-        automation.topics_sheet.append_row([next_id, '', topic])
+        # Next ID comes from the storage's allocator, not from re-reading every topic
+        get_services().storage().add_topic(topic)
         
         return jsonify({'success': True, 'message': 'Topic added successfully'})
     except Exception as e:
@@ -606,7 +717,7 @@ def get_random_idea():
             'top_p': 0.95
         }
         
-        response = requests.post(
+        response = get_grok_client().post(
             'https://api.x.ai/v1/chat/completions',
             headers=headers,
             json=data
@@ -662,6 +773,30 @@ def get_stats():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/render-cache/stats')
+def get_render_cache_stats():
+    """Get render cache hit/miss counters"""
+    try:
+        return jsonify({'success': True, 'stats': get_render_cache().stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/sheet-cache/stats')
+def get_sheet_cache_stats():
+    """Get worksheet snapshot cache counters"""
+    try:
+        return jsonify({'success': True, 'stats': get_sheet_cache().stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/grok-client/stats')
+def get_grok_client_stats():
+    """Get Grok connection reuse counters"""
+    try:
+        return jsonify({'success': True, 'stats': get_grok_client().stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/schedule-video', methods=['POST'])
 def schedule_video():
     """Schedule a video for future creation"""
@@ -677,34 +812,15 @@ def schedule_video():
         return jsonify({'success': False, 'error': 'Topic and scheduled time are required'})
     
     try:
-        automation = VideoAutomation(skip_external_setup=False)  # Keep Sheets setup for scheduling
-        
-        # Check if we have a "Scheduled" worksheet, if not create it
-        try:
-            scheduled_sheet = automation.spreadsheet.worksheet('Scheduled')
-        except:
-            # Create the Scheduled worksheet with extra column for script data
-            scheduled_sheet = automation.spreadsheet.add_worksheet(title='Scheduled', rows=100, cols=10)
-            # Add headers
-            headers = ['ID', 'Topic', 'Scheduled Time', 'Duration', 'Style', 'Status', 'Created At', 'Video ID', 'Script Data']
-            scheduled_sheet.append_row(headers)
-        
-        # Generate unique ID
-        existing_records = scheduled_sheet.get_all_records()
-        next_id = f"SCH{len(existing_records) + 1:04d}"
-        
-        # Add scheduled video with script data
-        scheduled_sheet.append_row([
-            next_id,
+        # Sheets creates the Scheduled worksheet (with the script data column) on first use
+        next_id = get_services().storage().add_scheduled(
             topic,
             scheduled_time,
             duration,
             style,
-            'Pending',
-            datetime.now().isoformat(),
-            '',  # Video ID will be filled when created
-            json.dumps(script_data) if script_data else ''  # Store script data as JSON
-        ])
+            # The sheet keeps only a reference; the compressed script lives in the blob store
+            get_script_blobs().put(script_data) if script_data else ''
+        )
         
         return jsonify({'success': True, 'id': next_id})
     except Exception as e:
@@ -715,33 +831,27 @@ def schedule_video():
 def get_scheduled_videos():
     """Get all scheduled videos"""
     try:
-        automation = VideoAutomation(skip_external_setup=False)  # Keep Sheets setup for getting scheduled videos
-        
-        try:
-            scheduled_sheet = automation.spreadsheet.worksheet('Scheduled')
-            records = scheduled_sheet.get_all_records()
-            
-            # Format records for frontend
-            videos = []
-            for record in records:
-                if record.get('Topic'):  # Skip empty rows
-                    videos.append({
-                        'id': record.get('ID'),
-                        'topic': record.get('Topic'),
-                        'scheduledTime': record.get('Scheduled Time'),
-                        'duration': record.get('Duration', 8),
-                        'style': record.get('Style', 'cinematic'),
-                        'status': record.get('Status', 'Pending'),
-                        'videoId': record.get('Video ID', '')
-                    })
-            
-            # Sort by scheduled time
-            videos.sort(key=lambda x: x['scheduledTime'])
-            
-            return jsonify({'success': True, 'videos': videos})
-        except:
-            # No scheduled sheet yet
-            return jsonify({'success': True, 'videos': []})
+        # UI polling is answered from the Sheets snapshot (or SQLite); writes from this process invalidate it
+        records = get_services().storage().list_scheduled()
+        
+        # Format records for frontend
+        videos = []
+        for record in records:
+            if record.get('Topic'):  # Skip empty rows
+                videos.append({
+                    'id': record.get('ID'),
+                    'topic': record.get('Topic'),
+                    'scheduledTime': record.get('Scheduled Time'),
+                    'duration': record.get('Duration', 8),
+                    'style': record.get('Style', 'cinematic'),
+                    'status': record.get('Status', 'Pending'),
+                    'videoId': record.get('Video ID', '')
+                })
+        
+        # Sort by scheduled time
+        videos.sort(key=lambda x: x['scheduledTime'])
+        
+        return jsonify({'success': True, 'videos': videos})
             
     except Exception as e:
         logger.error(f"Error getting scheduled videos: {str(e)}")
@@ -751,16 +861,8 @@ def get_scheduled_videos():
 def cancel_scheduled_video(video_id):
     """Cancel a scheduled video"""
     try:
-        automation = VideoAutomation(skip_external_setup=False)  # Keep Sheets setup for canceling scheduled videos
-        scheduled_sheet = automation.spreadsheet.worksheet('Scheduled')
-        
-        # Find the row with this ID
-        all_values = scheduled_sheet.get_all_values()
-        for idx, row in enumerate(all_values[1:], start=2):  # Skip header
-            if row[0] == video_id:
-                # Update status to Cancelled
-                scheduled_sheet.update_cell(idx, 6, 'Cancelled')
-                return jsonify({'success': True})
+        if get_services().storage().cancel_scheduled(video_id):
+            return jsonify({'success': True})
         
         return jsonify({'success': False, 'error': 'Video not found'})
     except Exception as e:
@@ -771,27 +873,8 @@ def cancel_scheduled_video(video_id):
 def clear_cancelled_videos():
     """Remove all cancelled videos from the schedule"""
     try:
-        automation = VideoAutomation(skip_external_setup=False)  # Keep Sheets setup for clearing cancelled videos
-        scheduled_sheet = automation.spreadsheet.worksheet('Scheduled')
-        
-        # Get all values
-        all_values = scheduled_sheet.get_all_values()
-        headers = all_values[0]
-        
-        # Filter out cancelled videos
-        filtered_rows = [headers]  # Keep headers
-        cleared_count = 0
-        
-        for row in all_values[1:]:  # Skip header
-            if row[5] != 'Cancelled':  # Status column is index 5
-                filtered_rows.append(row)
-            else:
-                cleared_count += 1
-        
-        # Clear the sheet and rewrite without cancelled videos
-        scheduled_sheet.clear()
-        if filtered_rows:
-            scheduled_sheet.update(filtered_rows)
+        # Only the cancelled rows are deleted - surviving rows are never rewritten
+        cleared_count = get_services().storage().clear_cancelled()
         
         return jsonify({'success': True, 'cleared': cleared_count})
     except Exception as e:
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Script Post-processing Microbenchmark
+Measures the per-script CPU cost of ScriptPipeline.normalize against the
+post-processing the script paths and /api/generate-script used to do, and the
+per-prompt cost of PromptOptimizer's subject/action scan and batch API
+
+Usage: python bench_script_pipeline.py [iterations]
+"""
+
+import copy
+import re
+import sys
+import time
+from prompt_optimizer import PromptOptimizer
+from script_pipeline import ScriptPipeline
+
+SINGLE_SCRIPT = {
+    'title': 'The Last Lighthouse Keeper',
+    'description': 'A lone keeper walks the spiral stairs one final time. #cinematic #shorts',
+    'script': 'Every night for forty years, he kept the light burning.',
+    'visual_prompts': (
+        'Opening shot (0-2s): an old man in a wool coat climbs a spiral iron staircase, lantern in hand. '
+        'Main action (2-6s): he turns to look out over a storm-lashed sea as waves crash against the rocks. '
+        'Closing shot (6-8s): the great lamp flares to life, sweeping a beam across the fog. '
+        'Environment: weathered brass, salt-stained glass, drifting sea spray. Audio: wind, distant foghorn.'
+    ),
+    'camera_work': 'Slow crane up the stairwell, 35mm lens, transitioning to a wide over-the-shoulder shot',
+    'lighting': 'Warm lantern key light against cold blue moonlight, volumetric fog',
+    'style_keywords': ['cinematic', 'photorealistic', 'film grain', 'anamorphic', 'moody', '8K'],
+    'hook': 'One light. One man. One last night.'
+}
+
+MULTI_SCRIPT = {
+    'title': 'Rise of the Machines',
+    'description': 'From the first loom to the first neural network. #tech #history',
+    'camera_work': 'Smooth steadicam with slow push-ins',
+    'lighting': 'Practical lights with cool rim lighting',
+    'style_keywords': ['cinematic', 'tech', 'clean', 'futuristic'],
+    'segments': [
+        {
+            'segment_number': n,
+            'script': f'Chapter {n} of the story of computing.',
+            'visual_prompts': f'Segment {n}: a machine from era {n} hums to life, gears turn and lights flicker as a person watches.',
+            'continuity_note': 'Cut on the blinking light'
+        }
+        for n in range(1, 4)
+    ]
+}
+
+
+def legacy_single(optimizer: PromptOptimizer, script_data, topic, style):
+    """Single-segment post-processing before the pipeline: two optimizer passes plus the endpoint's third"""
+    text = script_data['visual_prompts']
+    style_data = optimizer.generate_style_prompt(text, style=style)
+    script_data['visual_prompts'] = optimizer.optimize_prompt(text, style=style)
+    for field in ('camera_work', 'lighting', 'technical_specs', 'style_keywords'):
+        if field not in script_data:
+            script_data[field] = style_data[field]
+    script_data['final_veo3_prompt'] = f"{script_data['visual_prompts']}. Style: {', '.join(script_data['style_keywords'])}"
+    # /api/generate-script
+    if 'style_keywords' not in script_data:
+        script_data['style_keywords'] = optimizer.generate_style_prompt(script_data['visual_prompts'], style=style)['style_keywords']
+    return script_data
+
+
+def legacy_multi(optimizer: PromptOptimizer, script_data, topic, style):
+    """Multi-segment post-processing before the pipeline: prompts built twice, one unused style pass"""
+    prompts = [s['visual_prompts'] for s in script_data['segments']]
+    script_data['visual_prompts'] = ' '.join(prompts)
+    optimizer.generate_style_prompt(script_data['visual_prompts'], style=style)
+    script_data['final_veo3_prompt'] = f"{script_data['visual_prompts']}. Style: {', '.join(script_data['style_keywords'])}"
+    combined = [f"SEGMENT {i + 1} (8 seconds):\n{p}" for i, p in enumerate(prompts)]
+    script_data['visual_prompts'] = "\n\n".join(combined)
+    script_data['final_veo3_prompt'] = f"{script_data['visual_prompts']}\n\nStyle: {', '.join(script_data['style_keywords'])}"
+    # /api/generate-script
+    if 'style_keywords' not in script_data:
+        script_data['style_keywords'] = optimizer.generate_style_prompt(script_data['visual_prompts'], style=style)['style_keywords']
+    return script_data
+
+
+def legacy_scan(prompt):
+    """Subject/action extraction before the combined scanner: three patterns compiled per call"""
+    subjects = []
+    if re.search(r'\b(person|man|woman|child|character|people)\b', prompt, re.I):
+        subjects.append('person')
+    if re.search(r'\b(car|building|tree|object|device|machine)\b', prompt, re.I):
+        subjects.append('object')
+    return subjects, re.findall(r'\b(walk|run|jump|move|turn|look|speak|create|build|transform)\b', prompt, re.I)
+
+
+def per_script_us(fn, template, iterations):
+    """CPU microseconds per call, excluding the cost of copying the input"""
+    scripts = [copy.deepcopy(template) for _ in range(iterations)]
+    start = time.process_time()
+    for script in scripts:
+        fn(script)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    optimizer = PromptOptimizer()
+    pipeline = ScriptPipeline(optimizer)
+
+    cases = [
+        ('single-segment', SINGLE_SCRIPT, 1, legacy_single),
+        ('3-segment', MULTI_SCRIPT, 3, legacy_multi)
+    ]
+    # The pipeline is a faster path to the same output, not a different one. The
+    # single-segment final_veo3_prompt is the exception: it is compacted like the Veo request
+    for name, template, num_segments, legacy in cases:
+        expected = legacy(optimizer, copy.deepcopy(template), 'lighthouse', 'cinematic')
+        actual = pipeline.normalize(copy.deepcopy(template), 'lighthouse', 'cinematic', num_segments)
+        for field in ('visual_prompts', 'final_veo3_prompt'):
+            if num_segments > 1 or field == 'visual_prompts':
+                assert actual[field] == expected[field], f"{name}: {field} differs from the legacy output"
+        if num_segments > 1:
+            assert actual['segments'] == template['segments'], f"{name}: segment prompts were rewritten"
+
+    print(f"{'script':<16}{'legacy us':>12}{'pipeline us':>14}{'speedup':>10}")
+    for name, template, num_segments, legacy in cases:
+        before = per_script_us(lambda s: legacy(optimizer, s, 'lighthouse', 'cinematic'), template, iterations)
+        after = per_script_us(lambda s: pipeline.normalize(s, 'lighthouse', 'cinematic', num_segments), template, iterations)
+        print(f"{name:<16}{before:>12.1f}{after:>14.1f}{before / after:>9.2f}x")
+
+    # Per-prompt optimizer cost over a batch of segment prompts
+    prompts = [segment['visual_prompts'] for segment in MULTI_SCRIPT['segments']] + [SINGLE_SCRIPT['visual_prompts']]
+    print()
+    print(f"{'per prompt':<24}{'us':>10}")
+    uncached = PromptOptimizer(cache_size=0)
+    rows = [
+        ('legacy scan', lambda: [legacy_scan(p) for p in prompts]),
+        ('combined scan', lambda: [optimizer._scan(p) for p in prompts]),
+        ('optimize (uncached)', lambda: uncached.optimize_many(prompts)),
+        ('optimize_many (warm)', lambda: optimizer.optimize_many(prompts))
+    ]
+    rounds = max(1, iterations // 10)
+    for name, fn in rows:
+        start = time.process_time()
+        for _ in range(rounds):
+            fn()
+        print(f"{name:<24}{(time.process_time() - start) / (rounds * len(prompts)) * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
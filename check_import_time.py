@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Import-time Budget Check
+Imports each entry point in a fresh interpreter under `-X importtime` and fails if
+a heavy integration (Sheets, YouTube, FAL) is loaded at startup or the cumulative
+import time exceeds the budget. Run it in CI or before deploying.
+
+Usage: python check_import_time.py [module ...]
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+ENTRY_POINTS = ['app', 'scheduler']
+
+# Top-level packages that must only load through integrations.py
+LAZY_PACKAGES = ['gspread', 'googleapiclient', 'google_auth_oauthlib', 'fal_client']
+
+BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', '600'))
+
+_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure(module: str):
+    """(cumulative ms for module, set of every module imported along the way)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    imported, total_us = set(), 0
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        imported.add(name)
+        if name == module:
+            total_us = int(match.group(2))
+    return total_us / 1000, imported
+
+
+def main():
+    modules = sys.argv[1:] or ENTRY_POINTS
+    failures = []
+    for module in modules:
+        total_ms, imported = measure(module)
+        eager = sorted(
+            package for package in LAZY_PACKAGES
+            if any(name == package or name.startswith(package + '.') for name in imported)
+        )
+        print(f"{module:<12}{total_ms:>9.1f} ms  (budget {BUDGET_MS:.0f} ms)")
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)} at startup - load it via integrations.py")
+        if total_ms > BUDGET_MS:
+            failures.append(f"{module} took {total_ms:.1f} ms to import, over the {BUDGET_MS:.0f} ms budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Disk Cache
+Small JSON-on-disk cache with TTL expiry and a bounded number of entries,
+shared by every process that points at the same directory
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Optional
+from loguru import logger
+
+
+class DiskCache:
+    """Key/value cache stored as one JSON file per entry, evicting least recently used first"""
+
+    def __init__(self, directory: str, ttl_seconds: int, max_entries: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Stable hash of arbitrary JSON-serializable key parts"""
+        canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value, or None when missing or expired"""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - entry.get('created_at', 0) > self.ttl_seconds:
+            self.delete(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            # Bump mtime so eviction treats this entry as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry.get('value')
+
+    def set(self, key: str, value: Any):
+        """Store a value and evict old entries beyond max_entries"""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'created_at': time.time(), 'value': value}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Failed to write cache entry {key[:12]}: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+
+        self._evict()
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        entries = [
+            (entry.stat().st_mtime, entry.path)
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and entry.name.endswith('.json')
+        ]
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Streaming Video Downloader
+Streams render results to disk in chunks, resumes interrupted transfers with HTTP Range
+requests and can split large files over several parallel ranged connections
+"""
+
+import os
+import asyncio
+from typing import List, Optional, Tuple
+import httpx
+from loguru import logger
+
+# Transfer errors worth retrying (connection resets, timeouts, truncated bodies)
+RETRYABLE_ERRORS = (httpx.TransportError,)
+
+
+class VideoDownloader:
+    """Downloads files to a temp file and atomically renames them into place"""
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        max_retries: Optional[int] = None,
+        parallel_connections: Optional[int] = None,
+        parallel_min_bytes: Optional[int] = None
+    ):
+        self.client = client
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('DOWNLOAD_MAX_RETRIES', '5'))
+        self.parallel_connections = parallel_connections or int(os.getenv('DOWNLOAD_PARALLEL_CONNECTIONS', '1'))
+        self.parallel_min_bytes = parallel_min_bytes or int(os.getenv('DOWNLOAD_PARALLEL_MIN_BYTES', str(32 * 1024 * 1024)))
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0, read=120.0),
+                follow_redirects=True
+            )
+        return self.client
+
+    async def download(self, url: str, dest_path: str) -> str:
+        """Download url to dest_path without holding the whole body in memory"""
+        part_path = f"{dest_path}.part"
+        # A leftover part file belongs to an earlier download, maybe of another URL - never append to it
+        if os.path.exists(part_path):
+            os.unlink(part_path)
+
+        size, ranges_supported, validator = await self._probe(url)
+        try:
+            if (
+                self.parallel_connections > 1
+                and ranges_supported
+                and size is not None
+                and size >= self.parallel_min_bytes
+            ):
+                await self._download_parallel(url, part_path, size, validator)
+            else:
+                await self._download_single(url, part_path, size, validator)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.unlink(part_path)
+            raise
+
+        # Atomic rename - readers never see a half-written video
+        os.replace(part_path, dest_path)
+        return dest_path
+
+    async def _probe(self, url: str) -> Tuple[Optional[int], bool, Optional[str]]:
+        """Get the file size, whether the server accepts byte ranges, and a validator for If-Range"""
+        try:
+            response = await self._get_client().head(url)
+            if response.status_code != 200:
+                return None, False, None
+            length = response.headers.get('content-length')
+            ranges = response.headers.get('accept-ranges', '').lower() == 'bytes'
+            # If-Range needs a strong ETag; Last-Modified is the fallback
+            etag = response.headers.get('etag')
+            validator = etag if etag and not etag.startswith('W/') else response.headers.get('last-modified')
+            return (int(length) if length else None), ranges, validator
+        except RETRYABLE_ERRORS as e:
+            logger.warning(f"Download probe failed, falling back to a single stream: {e}")
+            return None, False, None
+
+    @staticmethod
+    def _resumes(response: httpx.Response, offset: int, size: Optional[int]) -> bool:
+        """Whether a ranged response continues exactly where the part file ends, in the same file"""
+        if response.status_code != 206:
+            return False
+        # Content-Range: bytes <start>-<end>/<total>
+        content_range = response.headers.get('content-range', '')
+        try:
+            span, total = content_range.split(' ', 1)[1].split('/')
+            start = int(span.split('-')[0])
+        except (IndexError, ValueError):
+            return False
+        return start == offset and (size is None or total == str(size))
+
+    async def _download_single(self, url: str, part_path: str, size: Optional[int], validator: Optional[str] = None):
+        """Stream to part_path, resuming from the bytes already on disk after a failure"""
+        for attempt in range(self.max_retries + 1):
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            if size is not None and offset == size:
+                return
+            if offset and ((size is not None and offset > size) or (size is None and validator is None)):
+                # Nothing proves the server still has the same file - start over
+                offset = 0
+
+            headers = {}
+            if offset:
+                headers['Range'] = f'bytes={offset}-'
+                if validator:
+                    # The server sends the whole new file instead if it changed
+                    headers['If-Range'] = validator
+            try:
+                async with self._get_client().stream('GET', url, headers=headers) as response:
+                    if response.status_code == 416 and response.headers.get('content-range') == f'bytes */{offset}':
+                        # Nothing left to fetch - part file already holds the whole body
+                        return
+                    response.raise_for_status()
+
+                    # Server ignored the Range header or the file changed, start over
+                    mode = 'ab' if offset and self._resumes(response, offset, size) else 'wb'
+                    if offset and mode == 'wb':
+                        logger.info("Cannot resume this download, restarting it")
+
+                    with open(part_path, mode) as f:
+                        async for chunk in response.aiter_bytes():
+                            f.write(chunk)
+
+                if size is None or os.path.getsize(part_path) >= size:
+                    return
+                raise httpx.RemoteProtocolError("Connection closed before download completed")
+
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                written = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                logger.warning(f"Download interrupted at {written} bytes ({e}), resuming (attempt {attempt + 2}/{self.max_retries + 1})")
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+    async def _download_parallel(self, url: str, part_path: str, size: int, validator: Optional[str] = None):
+        """Fetch byte ranges concurrently into a preallocated part file"""
+        logger.info(f"Downloading {size} bytes over {self.parallel_connections} connections")
+
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+
+        step = -(-size // self.parallel_connections)  # ceiling division
+        ranges: List[Tuple[int, int]] = [
+            (start, min(start + step, size) - 1) for start in range(0, size, step)
+        ]
+        await asyncio.gather(*(self._download_range(url, part_path, start, end, size, validator) for start, end in ranges))
+
+    async def _download_range(self, url: str, part_path: str, start: int, end: int, size: int, validator: Optional[str] = None):
+        """Fetch one byte range, resuming within the range after a failure"""
+        position = start
+        for attempt in range(self.max_retries + 1):
+            try:
+                headers = {'Range': f'bytes={position}-{end}'}
+                if validator:
+                    # A changed file comes back as a 200, which fails below instead of mixing versions
+                    headers['If-Range'] = validator
+                async with self._get_client().stream('GET', url, headers=headers) as response:
+                    if not self._resumes(response, position, size):
+                        raise httpx.HTTPStatusError(
+                            f"Expected partial content for range {position}-{end}, got {response.status_code}",
+                            request=response.request,
+                            response=response
+                        )
+                    with open(part_path, 'r+b') as f:
+                        f.seek(position)
+                        async for chunk in response.aiter_bytes():
+                            f.write(chunk)
+                            position += len(chunk)
+
+                if position > end:
+                    return
+                raise httpx.RemoteProtocolError("Connection closed before range completed")
+
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Range {start}-{end} interrupted at {position} ({e}), resuming")
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+
+def download_file(url: str, dest_path: str, **kwargs) -> str:
+    """Blocking convenience wrapper for scripts outside the render engine"""
+    async def _run():
+        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=120.0), follow_redirects=True) as client:
+            return await VideoDownloader(client=client, **kwargs).download(url, dest_path)
+
+    return asyncio.run(_run())
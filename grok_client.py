@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Shared Grok HTTP Client
+One pooled keep-alive session for all Grok API traffic, with connect/read timeouts
+and per-host connection limits
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from loguru import logger
+
+
+class GrokClient:
+    """Thread-safe wrapper around a pooled requests.Session"""
+
+    def __init__(
+        self,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        pool_maxsize: Optional[int] = None
+    ):
+        self.connect_timeout = connect_timeout or float(os.getenv('GROK_CONNECT_TIMEOUT', '5'))
+        # Script generation can take a while, but it should never hang forever
+        self.read_timeout = read_timeout or float(os.getenv('GROK_READ_TIMEOUT', '120'))
+        self.pool_maxsize = pool_maxsize or int(os.getenv('GROK_POOL_MAXSIZE', '10'))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,  # Distinct hosts kept in the pool
+            pool_maxsize=self.pool_maxsize,  # Keep-alive connections per host
+            pool_block=False,
+            # Only retry failures to connect - a POST that reached Grok is never replayed
+            max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.5)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._adapter = adapter
+
+        self.requests_sent = 0
+        # Set once Grok has refused a structured-output schema that a plain retry then got past
+        self.structured_output_rejected = False
+        self._lock = threading.Lock()
+
+    def post(self, url: str, headers: Optional[Dict] = None, json: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """Same call shape as requests.post, but over the pooled session with timeouts"""
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+        with self._lock:
+            self.requests_sent += 1
+        return self.session.post(url, headers=headers, json=json, **kwargs)
+
+    def post_structured(self, url: str, headers: Optional[Dict] = None, json: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """
+        post() for requests that may carry a structured-output response_format.
+
+        If Grok rejects the schema (HTTP 400), the request is sent once more without
+        it - callers validate and repair the reply either way - and once that works,
+        later requests leave the schema out from the start.
+        """
+        if not json or 'response_format' not in json:
+            return self.post(url, headers=headers, json=json, **kwargs)
+        plain = {key: value for key, value in json.items() if key != 'response_format'}
+        if self.structured_output_rejected:
+            return self.post(url, headers=headers, json=plain, **kwargs)
+
+        response = self.post(url, headers=headers, json=json, **kwargs)
+        if response.status_code != 400:
+            return response
+        logger.warning(f"Grok rejected the structured output schema, retrying without it: {response.text[:300]}")
+        response.close()
+        response = self.post(url, headers=headers, json=plain, **kwargs)
+        if response.status_code == 200:
+            self.structured_output_rejected = True
+        return response
+
+    def stats(self) -> Dict:
+        """Requests sent vs. connections opened - the difference is handshakes saved"""
+        connections = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+
+        with self._lock:
+            sent = self.requests_sent
+        return {
+            'requests': sent,
+            'connections_opened': connections,
+            'handshakes_saved': max(0, sent - connections)
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_grok_client() -> GrokClient:
+    """Get the process-wide Grok client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GrokClient()
+            logger.info("Created pooled Grok HTTP client")
+    return _client
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Reference Image Hosting
+Uploads each prepared reference image once and passes its short hosted URL to Veo
+instead of inlining megabytes of base64 in every segment request
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from loguru import logger
+from image_preparation import PreparedImage
+from integrations import load_fal_client
+
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp'
+}
+
+
+def fal_upload(data: bytes, content_type: str, file_name: str) -> str:
+    """Upload to FAL storage and return the access URL"""
+    return load_fal_client().upload(data, content_type, file_name)
+
+
+class ImageHost:
+    """Remembers hosted URLs by content hash so each image is uploaded once until it expires"""
+
+    def __init__(
+        self,
+        upload_fn: Optional[Callable[[bytes, str, str], str]] = None,
+        index_path: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        persist: bool = True
+    ):
+        self.upload_fn = upload_fn or fal_upload
+        self.index_path = index_path or os.getenv('IMAGE_HOST_INDEX', 'cache/hosted_images.json')
+        self.persist = persist
+        # Re-upload well before the storage provider expires the object
+        self.ttl_seconds = ttl_seconds or int(os.getenv('IMAGE_HOST_TTL_SECONDS', str(24 * 3600)))
+
+        self._lock = threading.Lock()
+        self._index = self._load()
+
+    def _load(self) -> Dict:
+        if not self.persist:
+            return {}
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable image host index {self.index_path}: {e}")
+            return {}
+
+    def _save(self):
+        if not self.persist:
+            return
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def url_for(self, image: PreparedImage) -> str:
+        """Hosted URL for an image, uploading it if there's no unexpired copy"""
+        with self._lock:
+            entry = self._index.get(image.content_hash)
+            if entry and entry['expires_at'] > time.time():
+                return entry['url']
+
+            file_name = f"{image.content_hash[:16]}.{EXTENSIONS.get(image.mime_type, 'bin')}"
+            url = self.upload_fn(image.data, image.mime_type, file_name)
+            logger.info(f"Uploaded reference image {file_name} ({len(image.data)} bytes)")
+
+            self._index[image.content_hash] = {
+                'url': url,
+                'expires_at': time.time() + self.ttl_seconds
+            }
+            # Drop expired entries while we're rewriting the index anyway
+            now = time.time()
+            self._index = {k: v for k, v in self._index.items() if v['expires_at'] > now}
+            self._save()
+            return url
+
+
+class LocalImageStore:
+    """Stand-in storage server on localhost for tests and offline development"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self._objects = {}
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                obj = store._objects.get(self.path.lstrip('/'))
+                if obj is None:
+                    self.send_error(404)
+                    return
+                data, content_type = obj
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name='local-image-store', daemon=True)
+        self._thread.start()
+
+    def upload(self, data: bytes, content_type: str, file_name: str) -> str:
+        """Same signature as fal_upload"""
+        key = f"{hashlib.sha256(data).hexdigest()[:16]}/{file_name}"
+        self._objects[key] = (data, content_type)
+        return f"{self.base_url}/{key}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+_host = None
+_host_lock = threading.Lock()
+
+
+def get_image_host() -> ImageHost:
+    """Get the process-wide image host (IMAGE_HOST_BACKEND=fal or local)"""
+    global _host
+    with _host_lock:
+        if _host is None:
+            if os.getenv('IMAGE_HOST_BACKEND', 'fal').lower() == 'local':
+                store = LocalImageStore()
+                logger.info(f"Using local image store at {store.base_url}")
+                # Local URLs die with the process, so don't persist them
+                _host = ImageHost(upload_fn=store.upload, persist=False)
+            else:
+                _host = ImageHost()
+    return _host
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Reference Image Preparation
+Normalizes each reference image once and caches the encoded payload by content hash,
+so every video segment and the Grok vision call reuse the same bytes
+"""
+
+import os
+import io
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from loguru import logger
+
+MIME_TYPES = {
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp'
+}
+
+
+def normalize_image(raw: bytes, max_size: int, image_format: str, quality: int) -> Tuple[bytes, str, tuple]:
+    """Decode, orient, downscale and re-encode an image without metadata
+
+    Runs in a worker process, so it only takes and returns picklable values.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(raw)) as img:
+        # Let the JPEG decoder skip detail we'd throw away anyway
+        img.draft('RGB', (max_size, max_size))
+
+        # Apply the EXIF orientation before the EXIF block is dropped
+        img = ImageOps.exif_transpose(img)
+
+        keep_alpha = image_format == 'webp' and img.mode in ('RGBA', 'LA', 'P')
+        if keep_alpha:
+            img = img.convert('RGBA')
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        if max(img.size) > max_size:
+            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+        # Strip EXIF, ICC profiles, comments and other metadata
+        img.info.clear()
+
+        buffer = io.BytesIO()
+        if image_format == 'webp':
+            img.save(buffer, format='WEBP', quality=quality, method=4)
+        else:
+            img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+        return buffer.getvalue(), MIME_TYPES[image_format], img.size
+
+
+class PreparedImage:
+    """A normalized reference image ready to be sent to an API"""
+
+    def __init__(self, content_hash: str, data: bytes, mime_type: str, size: tuple):
+        self.content_hash = content_hash
+        self.data = data
+        self.mime_type = mime_type
+        self.size = size
+        self._data_uri = None
+
+    @property
+    def data_uri(self) -> str:
+        """Base64 data URI, encoded on first use only"""
+        if self._data_uri is None:
+            self._data_uri = f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+        return self._data_uri
+
+
+class ImagePreparer:
+    """Bounded LRU cache of prepared images keyed by the hash of the source file
+
+    Decoding, resizing and encoding run in a process pool so large uploads
+    don't hold the GIL of the web worker.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_size: Optional[int] = None,
+        image_format: Optional[str] = None,
+        quality: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
+        self.max_entries = max_entries or int(os.getenv('IMAGE_CACHE_MAX_ENTRIES', '64'))
+        # Veo renders at 720p/1080p, so detail beyond ~1280px on the long edge is wasted payload
+        self.max_size = max_size or int(os.getenv('REFERENCE_IMAGE_MAX_SIZE', '1280'))
+        self.image_format = (image_format or os.getenv('REFERENCE_IMAGE_FORMAT', 'jpeg')).lower()
+        self.quality = quality or int(os.getenv('REFERENCE_IMAGE_QUALITY', '85'))
+        self.workers = workers if workers is not None else int(os.getenv('IMAGE_PREP_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+        if self.image_format not in MIME_TYPES:
+            raise ValueError(f"Unsupported reference image format: {self.image_format}")
+
+        self._cache = OrderedDict()
+        # (path, mtime, size) -> content hash, so unchanged files aren't re-hashed per segment
+        self._path_hashes = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def prepare(self, image_paths: List[str]) -> List[PreparedImage]:
+        """Prepare several images in order, normalizing cache misses in parallel"""
+        pool = self._get_pool()
+        if pool is None or len(image_paths) < 2:
+            return [self.prepare_one(path) for path in image_paths]
+
+        results = [None] * len(image_paths)
+        pending = {}
+        for i, path in enumerate(image_paths):
+            content_hash, raw = self._content_hash(path)
+            cached = self._get_cached(content_hash)
+            if cached is not None:
+                results[i] = cached
+            elif content_hash in pending:
+                pending[content_hash][1].append(i)
+            else:
+                if raw is None:
+                    with open(path, 'rb') as f:
+                        raw = f.read()
+                future = pool.submit(normalize_image, raw, self.max_size, self.image_format, self.quality)
+                pending[content_hash] = (future, [i], path)
+
+        for content_hash, (future, indexes, path) in pending.items():
+            prepared = self._store(content_hash, future.result(), path)
+            for i in indexes:
+                results[i] = prepared
+        return results
+
+    def prepare_one(self, image_path: str) -> PreparedImage:
+        """Normalize one image, reusing the cached payload when the content was seen before"""
+        content_hash, raw = self._content_hash(image_path)
+        cached = self._get_cached(content_hash)
+        if cached is not None:
+            return cached
+
+        if raw is None:
+            with open(image_path, 'rb') as f:
+                raw = f.read()
+
+        pool = self._get_pool()
+        args = (raw, self.max_size, self.image_format, self.quality)
+        normalized = pool.submit(normalize_image, *args).result() if pool else normalize_image(*args)
+        return self._store(content_hash, normalized, image_path)
+
+    def content_hash(self, image_path: str) -> str:
+        """SHA-256 of an image file's contents, without normalizing it"""
+        return self._content_hash(image_path)[0]
+
+    def _content_hash(self, image_path: str) -> Tuple[str, Optional[bytes]]:
+        """Hash of the file contents; raw bytes are returned when they had to be read"""
+        stat = os.stat(image_path)
+        path_key = (os.path.abspath(image_path), stat.st_mtime, stat.st_size)
+
+        raw = None
+        with self._lock:
+            content_hash = self._path_hashes.get(path_key)
+        if content_hash is None:
+            with open(image_path, 'rb') as f:
+                raw = f.read()
+            content_hash = hashlib.sha256(raw).hexdigest()
+            with self._lock:
+                if len(self._path_hashes) > self.max_entries * 8:
+                    self._path_hashes.clear()
+                self._path_hashes[path_key] = content_hash
+        return content_hash, raw
+
+    def _get_cached(self, content_hash: str) -> Optional[PreparedImage]:
+        with self._lock:
+            prepared = self._cache.get(content_hash)
+            if prepared is not None:
+                self._cache.move_to_end(content_hash)
+            return prepared
+
+    def _store(self, content_hash: str, normalized: Tuple[bytes, str, tuple], image_path: str) -> PreparedImage:
+        data, mime_type, size = normalized
+        prepared = PreparedImage(content_hash, data, mime_type, size)
+        logger.info(f"Prepared reference image {os.path.basename(image_path)}: {size}, {mime_type}, {len(data)} bytes")
+
+        with self._lock:
+            self._cache[content_hash] = prepared
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return prepared
+
+
+_preparer = None
+_preparer_lock = threading.Lock()
+
+
+def get_image_preparer() -> ImagePreparer:
+    """Get the process-wide image preparer"""
+    global _preparer
+    with _preparer_lock:
+        if _preparer is None:
+            _preparer = ImagePreparer()
+    return _preparer
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Lazy Integrations
+Accessors for the heavy third-party clients (Google Sheets, YouTube, FAL). Each one
+imports its library on first call, so web workers and scheduler runs that never touch
+an integration don't pay for loading it. check_import_time.py keeps them out of startup.
+"""
+
+
+def load_gspread():
+    """gspread module"""
+    import gspread
+    return gspread
+
+
+def load_service_account_credentials():
+    """google.oauth2.service_account.Credentials"""
+    from google.oauth2.service_account import Credentials
+    return Credentials
+
+
+def load_oauth_credentials():
+    """google.oauth2.credentials.Credentials (user OAuth tokens)"""
+    from google.oauth2.credentials import Credentials
+    return Credentials
+
+
+def load_auth_request():
+    """google.auth.transport.requests.Request, for refreshing tokens"""
+    from google.auth.transport.requests import Request
+    return Request
+
+
+def load_installed_app_flow():
+    """google_auth_oauthlib.flow.InstalledAppFlow"""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    return InstalledAppFlow
+
+
+def load_discovery_build():
+    """googleapiclient.discovery.build"""
+    from googleapiclient.discovery import build
+    return build
+
+
+def load_media_file_upload():
+    """googleapiclient.http.MediaFileUpload"""
+    from googleapiclient.http import MediaFileUpload
+    return MediaFileUpload
+
+
+def load_fal_client():
+    """fal_client module"""
+    import fal_client
+    return fal_client
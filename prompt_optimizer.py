@@ -4,13 +4,45 @@ Advanced Prompt Optimization System for Video Generation
 Enhances prompts using cinematography best practices and AI understanding
 """
 
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+import os
 import re
+import threading
+
+# One pass over the words of a prompt finds subjects and actions together -
+# set lookups per word instead of three case-insensitive regex scans
+_WORD = re.compile(r'\w+')
+_PERSON_WORDS = frozenset(['person', 'man', 'woman', 'child', 'character', 'people'])
+_OBJECT_WORDS = frozenset(['car', 'building', 'tree', 'object', 'device', 'machine'])
+_ACTION_WORDS = frozenset(['walk', 'run', 'jump', 'move', 'turn', 'look', 'speak', 'create', 'build', 'transform'])
+
+# Words as they start cinematography terms ("close-up", "bird's", "24fps")
+_TERM_WORD = re.compile(r"\w+(?:['-]\w+)*")
+# Per-second breakdowns like "0-2s" or "2-4 seconds" mean the prompt already has its own timing
+_TIMING = re.compile(r'\b\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?\s*s(?:ec(?:ond)?s?)?\b', re.I)
+# "Label: ..." lines from the CINEMATIC DETAILS block (or a ". Style: ..." tail appended to it)
+_DIRECTIVE = re.compile(r'^\s*\.?\s*(camera|lighting|timing|style|technical):\s*(.*?)\s*$', re.I)
+_LIST_DIRECTIVES = ('style', 'technical')
+# Dropped first when a prompt is over budget - least useful to Veo first
+_DROP_ORDER = ('technical', 'timing', 'style')
+_BLANK_RUNS = re.compile(r'\n{3,}')
+_TECHNICAL_SPECS = [('8k', '8K resolution'), ('24fps', '24fps'), ('motion blur', 'motion blur'), ('physics', 'perfect physics')]
+
+
+def _directive_label(line: str) -> Optional[str]:
+    match = _DIRECTIVE.match(line)
+    return match.group(1).lower() if match else None
 
 class PromptOptimizer:
     """Optimizes prompts for maximum video generation quality"""
     
-    def __init__(self):
+    def __init__(self, cache_size: Optional[int] = None):
+        # Optimized prompts keyed by (prompt, style) - scripts are re-optimized with identical text often
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv('PROMPT_OPTIMIZER_CACHE_SIZE', '512'))
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
         self.cinematography_terms = {
             'camera_movements': [
                 'dolly in', 'dolly out', 'truck left', 'truck right',
@@ -60,43 +92,105 @@ class PromptOptimizer:
             'climax': ['6-7 seconds', 'peak moment', 'key action'],
             'outro': ['7-8 seconds', 'final frame', 'closing shot']
         }
+        
+        self.max_prompt_chars = int(os.getenv('VEO_MAX_PROMPT_CHARS', '2500'))
+        self._term_index, self._terms_by_first_word = self._build_term_index()
+    
+    def _build_term_index(self) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+        """Map every known term (lowercased) to the concept it covers, and bucket terms by their first word"""
+        index = {}
+        for group in ('camera_movements', 'shot_types', 'lens_types'):
+            for term in self.cinematography_terms[group]:
+                # "close-up (CU)" is written "close-up"; "85mm portrait" is often just "85mm"
+                index[term.split(' (')[0].lower()] = 'camera'
+                if group == 'lens_types':
+                    index[term.split()[0].lower()] = 'camera'
+        for term in self.cinematography_terms['lighting_setups']:
+            index[term.lower()] = 'lighting'
+        for terms in self.style_enhancers.values():
+            for term in terms:
+                index.setdefault(term.lower(), 'style')
+        
+        by_first_word = {}
+        for term in index:
+            by_first_word.setdefault(_TERM_WORD.match(term).group(), []).append(term)
+        return index, by_first_word
+    
+    def concepts_in(self, text: str) -> Tuple[Set[str], Set[str]]:
+        """Known terms present in the text, and the concepts (camera/lighting/style/timing) they cover"""
+        # Only words that start some term are checked, so this is one pass over the words
+        lowered = text.lower()
+        terms = set()
+        for word in _TERM_WORD.finditer(lowered):
+            for term in self._terms_by_first_word.get(word.group(), ()):
+                end = word.start() + len(term)
+                if lowered.startswith(term, word.start()) and (end == len(lowered) or not (lowered[end].isalnum() or lowered[end] == '_')):
+                    terms.add(term)
+        
+        concepts = {self._term_index[term] for term in terms}
+        if _TIMING.search(text):
+            concepts.add('timing')
+        return terms, concepts
     
     def optimize_prompt(self, base_prompt: str, style: str = 'cinematic') -> str:
         """Optimize a prompt with cinematography best practices"""
+        key = (base_prompt, style)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
         
         # Extract key subjects and actions
-        subjects = self._extract_subjects(base_prompt)
-        actions = self._extract_actions(base_prompt)
+        subjects, actions = self._scan(base_prompt)
         
         # Build enhanced prompt
         enhanced_prompt = self._build_cinematic_prompt(
             base_prompt, subjects, actions, style
         )
         
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._cache[key] = enhanced_prompt
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        
         return enhanced_prompt
     
-    def _extract_subjects(self, prompt: str) -> List[str]:
-        """Extract main subjects from prompt"""
-        # Simple extraction - could be enhanced with NLP
-        subjects = []
-        
-        # Common subject patterns
-        person_patterns = r'\b(person|man|woman|child|character|people)\b'
-        object_patterns = r'\b(car|building|tree|object|device|machine)\b'
+    def optimize_many(self, prompts: List[str], style: str = 'cinematic') -> List[str]:
+        """Optimize a batch of prompts (e.g. every segment of a script), scanning each distinct prompt once"""
+        optimized = {}
+        for prompt in prompts:
+            if prompt not in optimized:
+                optimized[prompt] = self.optimize_prompt(prompt, style=style)
+        return [optimized[prompt] for prompt in prompts]
+    
+    def _scan(self, prompt: str) -> Tuple[List[str], List[str]]:
+        """Subjects and actions from a single scan of the prompt's words"""
+        found_person = found_object = False
+        actions = []
+        for word in _WORD.findall(prompt):
+            lowered = word.lower()
+            if lowered in _ACTION_WORDS:
+                actions.append(word)
+            elif lowered in _PERSON_WORDS:
+                found_person = True
+            elif lowered in _OBJECT_WORDS:
+                found_object = True
         
-        if re.search(person_patterns, prompt, re.I):
+        subjects = []
+        if found_person:
             subjects.append('person')
-        if re.search(object_patterns, prompt, re.I):
+        if found_object:
             subjects.append('object')
-            
-        return subjects
+        return subjects, actions
+    
+    def _extract_subjects(self, prompt: str) -> List[str]:
+        """Extract main subjects from prompt"""
+        return self._scan(prompt)[0]
     
     def _extract_actions(self, prompt: str) -> List[str]:
         """Extract main actions from prompt"""
-        # Action verbs
-        action_patterns = r'\b(walk|run|jump|move|turn|look|speak|create|build|transform)\b'
-        matches = re.findall(action_patterns, prompt, re.I)
-        return matches
+        return self._scan(prompt)[1]
     
     def _build_cinematic_prompt(
         self, 
@@ -105,28 +199,103 @@ class PromptOptimizer:
         actions: List[str],
         style: str
     ) -> str:
-        """Build a cinematically enhanced prompt"""
-        
-        # Start with the base
-        enhanced = f"{base_prompt}\n\nCINEMATIC DETAILS:\n"
+        """Build a cinematically enhanced prompt, adding only the details the base prompt doesn't already cover"""
+        terms, concepts = self.concepts_in(base_prompt)
+        lowered = base_prompt.lower()
+        details = []
         
         # Add camera work
-        enhanced += f"Camera: {self._select_camera_setup(subjects, actions)}\n"
+        if 'camera' not in concepts:
+            details.append(f"Camera: {self._select_camera_setup(subjects, actions)}")
         
         # Add lighting
-        enhanced += f"Lighting: {self._select_lighting(style)}\n"
+        if 'lighting' not in concepts:
+            details.append(f"Lighting: {self._select_lighting(style)}")
         
         # Add temporal breakdown
-        enhanced += f"Timing: {self._create_temporal_breakdown(actions)}\n"
+        if 'timing' not in concepts:
+            details.append(f"Timing: {self._create_temporal_breakdown(actions)}")
         
         # Add style keywords
         style_keywords = self.style_enhancers.get(style, self.style_enhancers['cinematic'])
-        enhanced += f"Style: {', '.join(style_keywords[:5])}\n"
+        missing_style = [keyword for keyword in style_keywords[:5] if keyword.lower() not in terms]
+        if missing_style:
+            details.append(f"Style: {', '.join(missing_style)}")
         
         # Add technical specs
-        enhanced += "Technical: 8K resolution, 24fps, motion blur, perfect physics\n"
+        technical = [spec for key, spec in _TECHNICAL_SPECS if key not in lowered]
+        if technical:
+            details.append(f"Technical: {', '.join(technical)}")
         
-        return enhanced
+        if not details:
+            return base_prompt
+        return f"{base_prompt}\n\nCINEMATIC DETAILS:\n" + "\n".join(details) + "\n"
+    
+    def compact_prompt(self, prompt: str, max_chars: Optional[int] = None) -> str:
+        """
+        Drop repeated lines, merge repeated Style/Technical directives, and fit the prompt
+        into max_chars (VEO_MAX_PROMPT_CHARS by default, 0 for no limit)
+        """
+        limit = self.max_prompt_chars if max_chars is None else max_chars
+        lines = []
+        seen = set()
+        list_directives = {}
+        
+        for line in prompt.split('\n'):
+            key = line.strip().lower()
+            if key and key in seen:
+                continue
+            
+            match = _DIRECTIVE.match(line)
+            if match and match.group(1).lower() in _LIST_DIRECTIVES:
+                label = match.group(1).capitalize()
+                items = [item.strip() for item in match.group(2).split(',') if item.strip()]
+                if label in list_directives:
+                    # Fold into the first directive with this label
+                    index, merged = list_directives[label]
+                    known = {item.lower() for item in merged}
+                    for item in items:
+                        if item.lower() not in known:
+                            known.add(item.lower())
+                            merged.append(item)
+                    lines[index] = f"{label}: {', '.join(merged)}"
+                    continue
+                list_directives[label] = (len(lines), items)
+                line = f"{label}: {', '.join(items)}"
+            
+            if key:
+                seen.add(key)
+            lines.append(line)
+        
+        # Folded lines leave gaps behind - keep at most one blank line between paragraphs
+        text = _BLANK_RUNS.sub("\n\n", "\n".join(lines)).strip()
+        if not limit or len(text) <= limit:
+            return text
+        
+        # Over budget: shed the least useful directives before touching the scene description
+        for label in _DROP_ORDER:
+            lines = [line for line in lines if _directive_label(line) != label]
+            text = self._without_empty_headers(lines)
+            if len(text) <= limit:
+                return text
+        
+        # Still too long - cut at the last sentence or line break that fits
+        cut = max(text.rfind('. ', 0, limit), text.rfind('\n', 0, limit))
+        if cut < limit // 2:
+            cut = text.rfind(' ', 0, limit)
+        return text[:cut + 1 if cut > 0 else limit].rstrip()
+    
+    @staticmethod
+    def _without_empty_headers(lines: List[str]) -> str:
+        """Join lines, dropping a CINEMATIC DETAILS header that has no details left under it"""
+        kept = []
+        for i, line in enumerate(lines):
+            if line.strip() == 'CINEMATIC DETAILS:':
+                following = [l for l in lines[i + 1:] if l.strip()]
+                if not following or not _directive_label(following[0]):
+                    continue
+            kept.append(line)
+        return _BLANK_RUNS.sub("\n\n", "\n".join(kept)).strip()
     
     def _select_camera_setup(self, subjects: List[str], actions: List[str]) -> str:
         """Select appropriate camera setup based on content"""
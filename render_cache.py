@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Content-addressed Render Cache
+Stores finished Veo renders on disk keyed by a hash of the exact request arguments
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from typing import Dict, Optional
+from loguru import logger
+
+
+class RenderCache:
+    """Size-bounded LRU cache of rendered MP4s keyed by endpoint + arguments"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or os.getenv('RENDER_CACHE_DIR', 'cache/renders')
+        self.max_bytes = max_bytes or int(os.getenv('RENDER_CACHE_MAX_BYTES', str(5 * 1024 ** 3)))
+        self.enabled = os.getenv('RENDER_CACHE_ENABLED', 'true').lower() == 'true'
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, endpoint: str, arguments: Dict) -> str:
+        """Hash the endpoint and arguments, replacing inline images with their digests"""
+        canonical = json.dumps(
+            {'endpoint': endpoint, 'arguments': self._digest_images(arguments)},
+            sort_keys=True,
+            separators=(',', ':')
+        )
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _digest_images(self, value):
+        """Swap data URIs for a short content digest so keys stay small"""
+        if isinstance(value, dict):
+            return {k: self._digest_images(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._digest_images(v) for v in value]
+        if isinstance(value, str) and value.startswith('data:'):
+            return f"sha256:{hashlib.sha256(value.encode('utf-8')).hexdigest()}"
+        return value
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def get(self, key: str, dest_path: str) -> bool:
+        """Copy a cached render to dest_path, returning False on a miss"""
+        if not self.enabled:
+            return False
+
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, dest_path)
+            # Bump mtime so eviction treats this entry as recently used
+            os.utime(path)
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += size
+        logger.info(f"Render cache hit: {key[:12]}")
+        return True
+
+    def put(self, key: str, video_path: str):
+        """Store a finished render and evict least recently used entries over the size limit"""
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(video_path, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache render {key[:12]}: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        """Drop oldest entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.mp4'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                logger.info(f"Evicted cached render: {os.path.basename(path)}")
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current disk usage"""
+        entries = 0
+        size = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.mp4'):
+                entries += 1
+                size += entry.stat().st_size
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'entries': entries,
+                'size_bytes': size,
+                'max_bytes': self.max_bytes
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """Get the process-wide render cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache()
+    return _cache
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Asyncio Render Engine for FAL video generation
+Submits Veo jobs, polls their queue status and downloads results on a single event loop
+"""
+
+import os
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+from integrations import load_fal_client
+from render_cache import RenderCache, get_render_cache
+
+
+class RenderEngine:
+    """Drives many in-flight FAL renders from one background event loop"""
+
+    def __init__(
+        self,
+        poll_interval: Optional[float] = None,
+        max_in_flight: Optional[int] = None,
+        cache: Optional[RenderCache] = None
+    ):
+        self.poll_interval = poll_interval or float(os.getenv('FAL_POLL_INTERVAL', '2'))
+        self.max_in_flight = max_in_flight or int(os.getenv('FAL_MAX_IN_FLIGHT', '32'))
+        self.cache = cache or get_render_cache()
+
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Created on the engine loop
+        self._in_flight = None
+        self._downloader = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the shared event loop thread on first use"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='render-engine',
+                    daemon=True
+                )
+                self._thread.start()
+                logger.info("Render engine event loop started")
+        return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the engine loop and block until it finishes (sync wrapper)"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def render_sync(self, endpoint: str, arguments: Dict, output_path: str, label: str = 'Veo3', cache_key: Optional[str] = None) -> str:
+        """Blocking wrapper around render() for existing synchronous callers"""
+        return self.run(self.render(endpoint, arguments, output_path, label, cache_key))
+
+    def render_many_sync(
+        self,
+        jobs: List[Dict],
+        max_concurrent: Optional[int] = None,
+        on_update: Optional[Callable[[int, str], None]] = None
+    ) -> List[str]:
+        """Blocking wrapper around render_many()"""
+        return self.run(self.render_many(jobs, max_concurrent, on_update))
+
+    async def render(self, endpoint: str, arguments: Dict, output_path: str, label: str = 'Veo3', cache_key: Optional[str] = None) -> str:
+        """
+        Submit a FAL job, wait for it to finish and download the video to output_path.
+        cache_key overrides the key derived from the arguments - for callers whose
+        arguments carry volatile values such as hosted image URLs
+        """
+        # Identical requests are served from the render cache without calling FAL
+        cache_key = cache_key or self.cache.make_key(endpoint, arguments)
+        if await asyncio.to_thread(self.cache.get, cache_key, output_path):
+            logger.info(f"{label} served from render cache: {output_path}")
+            return output_path
+
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+
+        fal_client = load_fal_client()
+        async with self._in_flight:
+            handle = await fal_client.submit_async(endpoint, arguments=arguments)
+            logger.info(f"{label} submitted to {endpoint}: {handle.request_id}")
+
+            logs_seen = 0
+            while True:
+                status = await handle.status(with_logs=True)
+
+                # Status logs are cumulative, only report new lines
+                logs = getattr(status, 'logs', None) or []
+                for log in logs[logs_seen:]:
+                    logger.info(f"{label} Progress: {log['message']}")
+                logs_seen = max(logs_seen, len(logs))
+
+                if isinstance(status, fal_client.Completed):
+                    if status.error:
+                        raise RuntimeError(f"{label} render failed: {status.error}")
+                    break
+
+                await asyncio.sleep(self.poll_interval)
+
+            result = await handle.get()
+
+        # Log the result to see structure
+        logger.info(f"{label} result: {result}")
+
+        # Download video - check for different possible keys
+        video_url = result.get('video', {}).get('url') or result.get('url') or result.get('video_url')
+
+        if not video_url:
+            logger.error(f"No video URL found in {label} result. Result structure: {result}")
+            raise ValueError(f"Failed to generate video: No video URL returned from {label} API")
+
+        await self._download(video_url, output_path)
+        await asyncio.to_thread(self.cache.put, cache_key, output_path)
+        logger.info(f"{label} video saved to: {output_path}")
+        return output_path
+
+    async def render_many(
+        self,
+        jobs: List[Dict],
+        max_concurrent: Optional[int] = None,
+        on_update: Optional[Callable[[int, str], None]] = None
+    ) -> List[str]:
+        """Render several jobs concurrently, returning output paths in job order
+
+        Each job is a dict with 'endpoint', 'arguments', 'output_path' and optional 'label' and 'cache_key'.
+        on_update(index, status) is called with 'rendering', 'completed' or 'failed'.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrent or len(jobs) or 1))
+
+        async def run_job(index: int, job: Dict) -> str:
+            async with semaphore:
+                if on_update:
+                    on_update(index, 'rendering')
+                try:
+                    path = await self.render(
+                        job['endpoint'],
+                        job['arguments'],
+                        job['output_path'],
+                        job.get('label', 'Veo3'),
+                        job.get('cache_key')
+                    )
+                except Exception:
+                    if on_update:
+                        on_update(index, 'failed')
+                    raise
+                if on_update:
+                    on_update(index, 'completed')
+                return path
+
+        tasks = [asyncio.ensure_future(run_job(i, job)) for i, job in enumerate(jobs)]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except Exception:
+            # Don't keep queued segments around once the job has failed
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def _download(self, url: str, output_path: str):
+        """Stream a rendered video to disk, resuming on flaky connections"""
+        if self._downloader is None:
+            # httpx is only needed once something is actually downloaded
+            from downloader import VideoDownloader
+            self._downloader = VideoDownloader()
+        await self._downloader.download(url, output_path)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_render_engine() -> RenderEngine:
+    """Get the process-wide render engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RenderEngine()
+    return _engine
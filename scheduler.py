@@ -1,17 +1,25 @@
 #!/usr/bin/env python3
 """
 Video Scheduler - Processes scheduled videos from Google Sheets
-Run this script via cron to automatically create videos at scheduled times
+Run this script via cron to automatically create videos at scheduled times,
+or with --daemon to keep running and start each video at its scheduled time
 """
 
 import os
 import sys
+import heapq
+import time
+import argparse
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
 from loguru import logger
 from dotenv import load_dotenv
 from video_automation import VideoAutomation
-import json
+from script_blobs import get_script_blobs
+from storage import parse_time
 
 # Load environment variables
 load_dotenv()
@@ -22,42 +30,35 @@ logger.add("logs/scheduler_{time}.log", rotation="1 week", retention="4 weeks")
 class VideoScheduler:
     def __init__(self):
         self.automation = VideoAutomation()
+        # Daemon mode
+        self.refresh_interval = float(os.getenv('SCHEDULER_REFRESH_SECONDS', '60'))
+        self.max_concurrent = int(os.getenv('SCHEDULER_MAX_CONCURRENT', '2'))
+        self._stop = threading.Event()
+        
+    @staticmethod
+    def _video_data(record: Dict) -> Dict:
+        """Scheduled record -> the job description process_scheduled_video takes"""
+        video_data = {
+            'row': record['row'],
+            'id': record.get('ID'),
+            'topic': record.get('Topic'),
+            'duration': int(record.get('Duration', 8)),
+            'style': record.get('Style', 'cinematic'),
+            'scheduled_time': parse_time(record.get('Scheduled Time'))
+        }
+        
+        # Check if we have pre-generated script data - a blob reference, or inline JSON on older rows
+        script_data = get_script_blobs().load(record.get('Script Data', ''))
+        if script_data:
+            video_data['script_data'] = script_data
+        elif record.get('Script Data'):
+            logger.warning(f"Script data for {video_data['id']} is unavailable, generating a new script")
+        return video_data
         
     def get_due_videos(self) -> List[Dict]:
         """Get videos that are due to be created"""
         try:
-            scheduled_sheet = self.automation.spreadsheet.worksheet('Scheduled')
-            all_records = scheduled_sheet.get_all_records()
-            
-            due_videos = []
-            current_time = datetime.now()
-            
-            for idx, record in enumerate(all_records, start=2):  # Start at 2 to account for header
-                if record.get('Status') == 'Pending' and record.get('Topic'):
-                    scheduled_time = datetime.fromisoformat(record.get('Scheduled Time'))
-                    
-                    # Check if video is due (scheduled time has passed)
-                    if scheduled_time <= current_time:
-                        video_data = {
-                            'row': idx,
-                            'id': record.get('ID'),
-                            'topic': record.get('Topic'),
-                            'duration': int(record.get('Duration', 8)),
-                            'style': record.get('Style', 'cinematic'),
-                            'scheduled_time': scheduled_time
-                        }
-                        
-                        # Check if we have pre-generated script data
-                        script_data_json = record.get('Script Data', '')
-                        if script_data_json:
-                            try:
-                                video_data['script_data'] = json.loads(script_data_json)
-                            except:
-                                pass
-                        
-                        due_videos.append(video_data)
-            
-            return due_videos
+            return [self._video_data(record) for record in self.automation.storage.due_scheduled(datetime.now())]
         except Exception as e:
             logger.error(f"Error getting due videos: {str(e)}")
             return []
@@ -65,11 +66,11 @@ class VideoScheduler:
     def process_scheduled_video(self, video_data: Dict):
         """Process a single scheduled video"""
         logger.info(f"Processing scheduled video: {video_data['id']} - {video_data['topic']}")
+        storage = self.automation.storage
         
         try:
-            # Update status to Processing
-            scheduled_sheet = self.automation.spreadsheet.worksheet('Scheduled')
-            scheduled_sheet.update_cell(video_data['row'], 6, 'Processing')
+            # Update status to Processing - Sheets sends it with the next interval flush while the video renders
+            storage.set_scheduled_status(video_data, 'Processing')
             
             # Determine number of segments
             num_segments = video_data['duration'] // 8
@@ -112,11 +113,10 @@ class VideoScheduler:
                 video_url = f"local://{video_path}"
             
             # Update scheduled sheet with success
-            scheduled_sheet.update_cell(video_data['row'], 6, 'Completed')
-            scheduled_sheet.update_cell(video_data['row'], 8, video_url)
+            storage.set_scheduled_status(video_data, 'Completed', video_id=video_url)
             
             # Also add to Published sheet
-            self.automation.videos_sheet.append_row([
+            storage.add_published([
                 video_data['id'],
                 video_data['topic'],
                 script_data['title'],
@@ -124,6 +124,9 @@ class VideoScheduler:
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 0  # Initial view count
             ])
+            # Job done: status, URL and Published row go out together; a failed
+            # flush stays queued rather than marking a finished video as Error
+            storage.flush(raise_errors=False)
             
             logger.success(f"Successfully created scheduled video: {video_data['id']}")
             
@@ -131,8 +134,8 @@ class VideoScheduler:
             logger.error(f"Error processing scheduled video {video_data['id']}: {str(e)}")
             # Update status to Error
             try:
-                scheduled_sheet = self.automation.spreadsheet.worksheet('Scheduled')
-                scheduled_sheet.update_cell(video_data['row'], 6, 'Error')
+                storage.set_scheduled_status(video_data, 'Error')
+                storage.flush()
             except:
                 pass
     
@@ -154,11 +157,121 @@ class VideoScheduler:
             self.process_scheduled_video(video)
             
         logger.info("Scheduler run completed")
+    
+    def run_daemon(self):
+        """
+        Keep running: pending videos sit in a min-heap keyed on scheduled time and the
+        loop sleeps until the next deadline. The schedule is refreshed every
+        SCHEDULER_REFRESH_SECONDS from a narrow ID/time/status read, and each video's
+        full row is read only when it fires.
+        """
+        logger.info(f"Starting scheduler daemon (refresh every {self.refresh_interval:.0f}s, "
+                    f"{self.max_concurrent} concurrent videos)")
+        heap: List = []  # (scheduled_time, id)
+        pending: Dict[str, Dict] = {}  # id -> latest index entry; heap items not matching it are stale
+        handled: Dict[str, datetime] = {}  # id -> scheduled time this daemon already started
+        next_refresh = 0.0
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='scheduled-video') as executor:
+            while not self._stop.is_set():
+                timeout = self.refresh_interval
+                try:
+                    now = time.monotonic()
+                    if now >= next_refresh:
+                        self._refresh_heap(heap, pending, handled)
+                        next_refresh = now + self.refresh_interval
+                    
+                    while heap and heap[0][0] <= datetime.now():
+                        scheduled_time, video_id = heapq.heappop(heap)
+                        entry = pending.get(video_id)
+                        if entry is None or entry['scheduled_time'] != scheduled_time:
+                            continue  # Cancelled or rescheduled since it was pushed
+                        del pending[video_id]
+                        video_data = self._claim(entry)
+                        if video_data:
+                            handled[video_id] = scheduled_time
+                            executor.submit(self.process_scheduled_video, video_data)
+                    
+                    # Sleep until the next deadline or refresh, whichever is first
+                    timeout = next_refresh - time.monotonic()
+                    if heap:
+                        timeout = min(timeout, (heap[0][0] - datetime.now()).total_seconds())
+                except Exception as e:
+                    # One bad row must not take the daemon down - log it and carry on
+                    logger.exception(f"Scheduler daemon iteration failed: {str(e)}")
+                self._stop.wait(max(0.5, timeout))
+            
+            logger.info("Scheduler daemon stopping, waiting for videos in progress")
+        self.automation.storage.flush(raise_errors=False)
+    
+    def _refresh_heap(self, heap: List, pending: Dict[str, Dict], handled: Dict[str, datetime]):
+        """Pick up new, rescheduled and cancelled videos"""
+        try:
+            index = self.automation.storage.schedule_index()
+        except Exception as e:
+            logger.error(f"Error refreshing schedule, keeping the current one: {str(e)}")
+            return
+        
+        latest = {}
+        for entry in index:
+            # Naive and aware times can't share the heap - bring every entry to local naive
+            scheduled_time = parse_time(entry['scheduled_time'])
+            if scheduled_time is None:
+                continue
+            entry = dict(entry, scheduled_time=scheduled_time)
+            # Our own Processing/Completed writes may not have reached the sheet yet
+            if handled.get(entry['id']) == entry['scheduled_time']:
+                continue
+            latest[entry['id']] = entry
+            known = pending.get(entry['id'])
+            if known is None or known['scheduled_time'] != entry['scheduled_time']:
+                heapq.heappush(heap, (entry['scheduled_time'], entry['id']))
+        
+        pending.clear()
+        pending.update(latest)
+        # Once a started video leaves the Pending index its status writes have landed - forget it
+        listed = {entry['id'] for entry in index}
+        for video_id in [video_id for video_id in handled if video_id not in listed]:
+            del handled[video_id]
+        # Drop heap items whose video is gone once they outnumber live ones
+        if len(heap) > 2 * len(pending) + 16:
+            heap[:] = [(t, i) for t, i in heap if i in pending and pending[i]['scheduled_time'] == t]
+            heapq.heapify(heap)
+        logger.debug(f"Schedule refreshed: {len(pending)} pending videos")
+    
+    def _claim(self, entry: Dict) -> Optional[Dict]:
+        """Re-read a video as it fires, so a last-minute cancel or edit is respected"""
+        try:
+            record = self.automation.storage.get_scheduled(entry['id'], entry['row'])
+        except Exception as e:
+            logger.error(f"Error reading scheduled video {entry['id']}: {str(e)}")
+            return None
+        if not record or record.get('Status') != 'Pending' or not record.get('Topic'):
+            return None
+        video_data = self._video_data(record)
+        if video_data['scheduled_time'] is None:
+            logger.warning(f"Scheduled video {entry['id']} has an unreadable Scheduled Time, skipping")
+            return None
+        return video_data
+    
+    def stop(self, *_):
+        """Stop the daemon after the videos in progress finish"""
+        self._stop.set()
 
 def main():
     """Run the scheduler"""
+    parser = argparse.ArgumentParser(description='Process scheduled videos')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and start each video at its scheduled time instead of once per cron tick')
+    args = parser.parse_args()
+    
     scheduler = VideoScheduler()
-    scheduler.run()
+    if args.daemon:
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        scheduler.run_daemon()
+    else:
+        scheduler.run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
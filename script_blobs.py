@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Script Blob Store
+Scheduled videos' script data kept out of the Scheduled sheet: each script is
+stored once, zlib-compressed and named by the SHA-256 of its canonical JSON, and
+the sheet's Script Data cell holds only the reference. Clearing cancelled videos
+deletes the blobs no other row uses; blobs of completed videos are kept
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Optional
+from loguru import logger
+
+REF_PREFIX = 'sha256:'
+_REF = re.compile(r'sha256:([0-9a-f]{64})')
+# A blob stored this recently may belong to a row that is still being added - never release it
+RELEASE_GRACE_SECONDS = 300
+
+
+class ScriptBlobStore:
+    """Content-addressed, compressed script storage - identical scripts share one blob"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.getenv('SCRIPT_BLOB_DIR', 'data/script_blobs')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.directory, digest[:2], f"{digest}.json.z")
+
+    def put(self, script_data: Dict) -> str:
+        """Store a script and return the reference to keep in the sheet"""
+        canonical = json.dumps(script_data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(canonical).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            # Reused by a new row - restart its grace period so release() leaves it alone
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # The web app and scheduler share the directory - temp names must be unique across processes
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(zlib.compress(canonical, 6))
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+        return f"{REF_PREFIX}{digest}"
+
+    def get(self, ref: str) -> Optional[Dict]:
+        """Script for a reference, or None if the blob is missing or corrupt"""
+        match = _REF.fullmatch(ref or '')
+        if not match:
+            return None
+        digest = match.group(1)
+        try:
+            with open(self._path(digest), 'rb') as f:
+                canonical = zlib.decompress(f.read())
+        except (OSError, zlib.error) as e:
+            logger.warning(f"Script blob {digest[:12]} unavailable: {e}")
+            return None
+        if hashlib.sha256(canonical).hexdigest() != digest:
+            logger.warning(f"Script blob {digest[:12]} failed its integrity check")
+            return None
+        return json.loads(canonical)
+
+    def load(self, value: str) -> Optional[Dict]:
+        """
+        Script Data cell -> script: a blob reference, or the inline JSON older rows
+        still carry. None when the cell is empty or unreadable.
+        """
+        value = (value or '').strip() if isinstance(value, str) else value
+        if not value:
+            return None
+        if isinstance(value, str) and value.startswith(REF_PREFIX):
+            return self.get(value)
+        try:
+            data = json.loads(value) if isinstance(value, str) else value
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def release(self, values: Iterable, keep: Iterable = ()) -> int:
+        """
+        Delete the blobs behind removed rows' Script Data cells, except those still
+        referenced by a cell in keep or stored within the grace period. Returns how
+        many were deleted.
+        """
+        kept = {str(value).strip() for value in keep if value}
+        deleted = 0
+        for value in {str(value).strip() for value in values if value} - kept:
+            match = _REF.fullmatch(value)
+            if not match:
+                continue  # Inline JSON from older rows - nothing on disk
+            path = self._path(match.group(1))
+            try:
+                if time.time() - os.path.getmtime(path) < RELEASE_GRACE_SECONDS:
+                    continue
+                os.unlink(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_script_blobs() -> ScriptBlobStore:
+    """Get the process-wide script blob store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ScriptBlobStore()
+    return _store
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script Cache
+Keeps generated scripts server-side between the preview and render steps, and serves
+repeat requests for the same topic/style/length/images without another Grok call
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+from disk_cache import DiskCache
+
+
+class ScriptCache:
+    """Scripts keyed on their generation inputs; the key doubles as the script ID"""
+
+    def __init__(self, directory: Optional[str] = None, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.cache = DiskCache(
+            directory or os.getenv('SCRIPT_CACHE_DIR', 'cache/scripts'),
+            ttl_seconds=ttl_seconds or int(os.getenv('SCRIPT_CACHE_TTL_SECONDS', str(24 * 3600))),
+            max_entries=max_entries or int(os.getenv('SCRIPT_CACHE_MAX_ENTRIES', '1000'))
+        )
+
+    def script_id(self, topic: str, style: str, num_segments: int, image_hashes: List[str], prompt_version: int) -> str:
+        """ID for a script generated from these inputs"""
+        return self.cache.make_key(topic.strip().lower(), style, num_segments, image_hashes, prompt_version)
+
+    def lookup(self, script_id: str) -> Optional[Dict]:
+        """Script data for an ID, or None if it expired or was never generated"""
+        # IDs come from clients and name files on disk, so only accept our own hex digests
+        if not re.fullmatch(r'[0-9a-f]{64}', script_id or ''):
+            return None
+        entry = self.cache.get(script_id)
+        return entry['script_data'] if entry else None
+
+    def store(self, script_id: str, script_data: Dict, topic: str, style: str, num_segments: int):
+        self.cache.set(script_id, {
+            'script_data': script_data,
+            'topic': topic,
+            'style': style,
+            'num_segments': num_segments
+        })
+
+    def stats(self) -> Dict:
+        return self.cache.stats()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_script_cache() -> ScriptCache:
+    """Get the process-wide script cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ScriptCache()
+    return _cache
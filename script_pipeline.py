@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script Post-processing Pipeline
+One normalization pass shared by single- and multi-segment scripts: every
+transformation (style defaults, prompt optimization, preview prompt assembly)
+runs exactly once per script
+"""
+
+from typing import Dict, List
+from prompt_optimizer import PromptOptimizer
+
+
+class ScriptPipeline:
+    """Turns a parsed, validated Grok script into the script data the UI and renderer use"""
+
+    def __init__(self, optimizer: PromptOptimizer):
+        self.optimizer = optimizer
+
+    def normalize(self, script_data: Dict, topic: str, style: str = 'cinematic', num_segments: int = 1) -> Dict:
+        """Fill style defaults, optimize/assemble the visual prompts, and build final_veo3_prompt in place"""
+        # Style defaults depend only on the style, so one lookup covers every missing field
+        style_data = self.optimizer.generate_style_prompt(topic, style=style)
+        for field in ('camera_work', 'lighting', 'style_keywords'):
+            if not script_data.get(field):
+                script_data[field] = style_data[field]
+        script_data.setdefault('technical_specs', style_data['technical_specs'])
+
+        if num_segments == 1:
+            self._single_segment(script_data, style)
+        else:
+            self._multi_segment(script_data)
+
+        # Ensure we always have at least one prompt field
+        if not script_data.get('visual_prompts'):
+            length = f"{num_segments * 8}-second " if num_segments > 1 else ''
+            script_data['visual_prompts'] = f"Create a {length}video about {topic}"
+            script_data['final_veo3_prompt'] = script_data['visual_prompts']
+
+        return script_data
+
+    def _single_segment(self, script_data: Dict, style: str):
+        visual_prompts = script_data.get('visual_prompts')
+        if not visual_prompts:
+            return
+
+        script_data['visual_prompts'] = self.optimizer.optimize_prompt(visual_prompts, style=style)
+        # Same compaction the renderer applies, so the preview shows exactly what Veo gets
+        script_data['final_veo3_prompt'] = self.optimizer.compact_prompt(self._with_style(script_data, '. Style: '))
+
+    def _multi_segment(self, script_data: Dict):
+        # Segment prompts go to Veo as Grok wrote them (the renderer only compacts them);
+        # the cinematic pass is for single-segment scripts
+        combined: List[str] = [
+            f"SEGMENT {i + 1} (8 seconds):\n{segment['visual_prompts']}"
+            for i, segment in enumerate(script_data.get('segments') or [])
+            if isinstance(segment, dict) and segment.get('visual_prompts')
+        ]
+        if not combined:
+            return
+
+        # Combined prompts are for the preview; segments keep their own prompts for rendering
+        script_data['visual_prompts'] = "\n\n".join(combined)
+        script_data['final_veo3_prompt'] = self._with_style(script_data, '\n\nStyle: ')
+
+    @staticmethod
+    def _with_style(script_data: Dict, separator: str) -> str:
+        """The prompt Veo 3 will see: visual prompts plus the style keywords"""
+        keywords = script_data.get('style_keywords')
+        if not isinstance(keywords, list) or not keywords:
+            return script_data['visual_prompts']
+        return f"{script_data['visual_prompts']}{separator}{', '.join(keywords)}"
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Script Schema
+Declared JSON shape of Grok's scripts: the response_format that asks Grok for
+schema-conforming JSON, tolerant parsing that salvages whatever fields did arrive,
+and validation that names exactly which fields still need to be re-requested
+"""
+
+import json
+import re
+from typing import Dict, List, Optional
+from script_stream import JSONFieldParser
+
+_STRING = {'type': 'string', 'minLength': 1}
+
+SCRIPT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'title': _STRING,
+        'description': _STRING,
+        'script': _STRING,
+        'visual_prompts': _STRING,
+        'camera_work': _STRING,
+        'lighting': _STRING,
+        'style_keywords': {'type': 'array', 'items': _STRING, 'minItems': 1},
+        'hook': _STRING
+    },
+    'required': ['title', 'description', 'script', 'visual_prompts', 'camera_work', 'lighting', 'style_keywords', 'hook'],
+    'additionalProperties': False
+}
+
+SEGMENT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'segment_number': {'type': 'integer'},
+        'script': _STRING,
+        'visual_prompts': _STRING,
+        'continuity_note': {'type': 'string'}
+    },
+    'required': ['segment_number', 'script', 'visual_prompts', 'continuity_note'],
+    'additionalProperties': False
+}
+
+
+MULTI_SCENE_SCRIPT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'title': _STRING,
+        'description': _STRING,
+        'scenes': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'scene_number': {'type': 'integer'},
+                    'narration': _STRING,
+                    'visual_prompt': _STRING
+                },
+                'required': ['scene_number', 'narration', 'visual_prompt'],
+                'additionalProperties': False
+            },
+            'minItems': 4,
+            'maxItems': 4
+        },
+        'hook': _STRING
+    },
+    'required': ['title', 'description', 'scenes', 'hook'],
+    'additionalProperties': False
+}
+
+
+def multi_segment_script_schema(num_segments: int) -> Dict:
+    """Schema for a script split into exactly num_segments segments"""
+    return {
+        'type': 'object',
+        'properties': {
+            'title': _STRING,
+            'description': _STRING,
+            'camera_work': _STRING,
+            'lighting': _STRING,
+            'style_keywords': {'type': 'array', 'items': _STRING, 'minItems': 1},
+            'segments': {
+                'type': 'array',
+                'items': SEGMENT_SCHEMA,
+                'minItems': num_segments,
+                'maxItems': num_segments
+            }
+        },
+        'required': ['title', 'description', 'camera_work', 'lighting', 'style_keywords', 'segments'],
+        'additionalProperties': False
+    }
+
+
+def response_format(schema: Dict, name: str) -> Dict:
+    """response_format for Grok's structured output mode"""
+    return {
+        'type': 'json_schema',
+        'json_schema': {'name': name, 'schema': schema, 'strict': True}
+    }
+
+
+def subset_schema(schema: Dict, fields: List[str]) -> Dict:
+    """The same schema restricted to a few top-level fields, for re-requesting just those"""
+    return {
+        'type': 'object',
+        'properties': {field: schema['properties'][field] for field in fields},
+        'required': list(fields),
+        'additionalProperties': False
+    }
+
+
+def parse_script_json(content: str) -> Dict:
+    """
+    Parse a script from Grok's reply without giving up on the first syntax error.
+
+    Tries the whole reply, then a fenced ```json block, then the outermost braces,
+    and finally salvages every top-level field that closed before the JSON broke
+    (e.g. a truncated reply). Returns an empty dict if nothing is recoverable.
+    """
+    candidates = [content]
+    fenced = re.search(r'```(?:json)?\s*(.*?)\s*```', content, re.DOTALL)
+    if fenced:
+        candidates.append(fenced.group(1))
+    start, end = content.find('{'), content.rfind('}')
+    if start != -1 and end > start:
+        candidates.append(content[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+
+    parser = JSONFieldParser()
+    return {event[1]: event[2] for event in parser.feed(content) if event[0] == 'field'}
+
+
+def _flatten_prompt(value: Dict) -> str:
+    """Structured visual prompts -> one narrative string"""
+    parts = []
+    for item in value.values():
+        if isinstance(item, dict):
+            parts.extend(str(sub_value) for sub_value in item.values())
+        else:
+            parts.append(str(item))
+    return " ".join(parts)
+
+
+def repair_script(data: Dict) -> Dict:
+    """Coerce near-miss values into the declared types in place"""
+    if isinstance(data.get('visual_prompts'), dict):
+        data['_original_visual_prompts'] = data['visual_prompts'].copy()
+        data['visual_prompts'] = _flatten_prompt(data['visual_prompts'])
+
+    keywords = data.get('style_keywords')
+    if isinstance(keywords, str):
+        data['style_keywords'] = [k.strip() for k in keywords.split(',') if k.strip()]
+
+    segments = data.get('segments')
+    if isinstance(segments, list):
+        for i, segment in enumerate(segments):
+            if not isinstance(segment, dict):
+                continue
+            if isinstance(segment.get('visual_prompts'), dict):
+                segment['visual_prompts'] = _flatten_prompt(segment['visual_prompts'])
+            number = segment.get('segment_number')
+            if isinstance(number, str) and number.strip().isdigit():
+                segment['segment_number'] = int(number)
+            elif number is None:
+                segment['segment_number'] = i + 1
+            # Only a hint for the next segment - not worth a re-request
+            segment.setdefault('continuity_note', '')
+    return data
+
+
+def _matches(value, schema: Dict) -> bool:
+    kind = schema.get('type')
+    if kind == 'string':
+        return isinstance(value, str) and len(value.strip()) >= schema.get('minLength', 0)
+    if kind == 'integer':
+        return isinstance(value, int) and not isinstance(value, bool)
+    if kind == 'array':
+        if not isinstance(value, list):
+            return False
+        if len(value) < schema.get('minItems', 0) or len(value) > schema.get('maxItems', len(value)):
+            return False
+        return all(_matches(item, schema['items']) for item in value)
+    if kind == 'object':
+        if not isinstance(value, dict):
+            return False
+        return all(
+            field in value and _matches(value[field], schema['properties'][field])
+            for field in schema.get('required', [])
+        )
+    return True
+
+
+def invalid_fields(data: Dict, schema: Dict) -> List[str]:
+    """Required top-level fields that are missing, empty, or the wrong shape"""
+    return [
+        field for field in schema['required']
+        if field not in data or not _matches(data[field], schema['properties'][field])
+    ]
+
+
+def merge_fields(data: Dict, patch: Optional[Dict], fields: List[str]) -> Dict:
+    """Take only the requested fields from a re-request reply"""
+    for field in fields:
+        if patch and field in patch:
+            data[field] = patch[field]
+    return data
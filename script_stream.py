@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Streaming Script Parsing
+Reads Grok's server-sent-event completion stream and picks complete top-level JSON
+fields out of the partial script as soon as they close, so the UI can show the title
+and hook long before the whole completion has arrived
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+def iter_sse_content(lines: Iterable) -> Iterator[str]:
+    """Yield the content deltas from an OpenAI-style chat completion SSE stream"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        # Blank separators, comments/keep-alives and event names carry no content
+        if not line.startswith('data:'):
+            continue
+
+        payload = line[len('data:'):].strip()
+        if payload == '[DONE]':
+            return
+
+        try:
+            chunk = json.loads(payload)
+        except ValueError:
+            continue
+
+        for choice in chunk.get('choices', []):
+            content = (choice.get('delta') or {}).get('content')
+            if content:
+                yield content
+
+
+class JSONFieldParser:
+    """
+    Incremental parser for a single JSON object arriving in pieces.
+
+    feed() returns the events completed by the new text:
+      ('field', key, value)        - a top-level field closed
+      ('item', key, index, value)  - an object inside a top-level array closed
+    Anything before the opening brace (e.g. a markdown fence) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+        # Top-level key/value being read
+        self._phase = 'key'  # key -> colon -> value
+        self._token_start = None
+        self._key = None
+        self._value_start = None
+        self._value_is_array = False
+
+        # Object items inside a top-level array
+        self._item_start = None
+        self._item_index = 0
+
+    @property
+    def done(self) -> bool:
+        """True once the closing brace of the object has been seen"""
+        return self._done
+
+    def feed(self, text: str) -> List[Tuple]:
+        self.buffer += text
+        events = []
+
+        while self._pos < len(self.buffer) and not self._done:
+            i = self._pos
+            ch = self.buffer[i]
+            self._pos += 1
+
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._close_top_level_string(i, events)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._phase == 'key':
+                        self._token_start = i
+                    elif self._phase == 'value' and self._value_start is None:
+                        self._value_start = i
+                continue
+
+            if ch in ' \t\r\n':
+                continue
+
+            if self._depth == 1:
+                self._top_level_char(i, ch, events)
+            elif ch in '{[':
+                self._depth += 1
+                if self._depth == 3 and self._value_is_array and ch == '{':
+                    self._item_start = i
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 2 and self._item_start is not None:
+                    self._emit_item(i, events)
+                elif self._depth == 1:
+                    self._emit_field(i + 1, events)
+
+        return events
+
+    def _top_level_char(self, i: int, ch: str, events: List[Tuple]):
+        if self._phase == 'colon':
+            if ch == ':':
+                self._phase = 'value'
+                self._value_start = None
+            return
+
+        if self._phase != 'value':
+            if ch == '}':
+                self._done = True
+            return
+
+        if self._value_start is None:
+            if ch in '{[':
+                self._value_start = i
+                self._value_is_array = ch == '['
+                self._depth += 1
+            elif ch == '}':
+                self._done = True
+            else:
+                # Number, true/false/null - ends at the next comma or closing brace
+                self._value_start = i
+            return
+
+        if ch in ',}':
+            self._emit_field(i, events)
+            if ch == '}':
+                self._done = True
+
+    def _close_top_level_string(self, i: int, events: List[Tuple]):
+        if self._phase == 'key':
+            self._key = json.loads(self.buffer[self._token_start:i + 1])
+            self._phase = 'colon'
+        elif self._phase == 'value':
+            self._emit_field(i + 1, events)
+
+    def _emit_field(self, end: int, events: List[Tuple]):
+        raw = self.buffer[self._value_start:end].strip()
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = None
+        else:
+            events.append(('field', self._key, value))
+
+        self._phase = 'key'
+        self._key = None
+        self._value_start = None
+        self._value_is_array = False
+        self._item_start = None
+        self._item_index = 0
+
+    def _emit_item(self, i: int, events: List[Tuple]):
+        try:
+            value = json.loads(self.buffer[self._item_start:i + 1])
+        except ValueError:
+            pass
+        else:
+            events.append(('item', self._key, self._item_index, value))
+        self._item_index += 1
+        self._item_start = None
+
+    def result(self) -> Dict[str, Any]:
+        """The complete object, parsed from everything fed so far"""
+        start = self.buffer.find('{')
+        end = self.buffer.rfind('}')
+        if start == -1 or end < start:
+            raise json.JSONDecodeError('No JSON object in streamed content', self.buffer, 0)
+        return json.loads(self.buffer[start:end + 1])
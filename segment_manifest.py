@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Segment Manifest for multi-segment video jobs
+Records each completed segment on disk so a retried or crashed job only renders what is missing
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows - only jobs in one process are kept apart
+    fcntl = None
+
+# Job directories owned by this process; flock covers other processes
+_owned = set()
+_owned_lock = threading.Lock()
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SegmentManifest:
+    """Job manifest stored as manifest.json inside the job's segment directory"""
+
+    def __init__(self, job_dir: str):
+        self.job_dir = job_dir
+        self.path = os.path.join(job_dir, 'manifest.json')
+        self._lock = threading.Lock()
+        self._owner_file = None
+
+        os.makedirs(job_dir, exist_ok=True)
+        self.data = self._load()
+
+    @classmethod
+    def open_job(cls, root: str, job_key: str) -> 'SegmentManifest':
+        """
+        Manifest for a job, owned exclusively until release() or clear().
+
+        Retries of a script resume from root/<job_key>. While another job with the
+        same script (another request, or another scheduler worker) owns that
+        directory, this one renders into a private directory instead, so neither
+        can clear the other's segments.
+        """
+        manifest = cls(os.path.join(root, job_key))
+        if manifest._acquire():
+            return manifest
+        private_dir = os.path.join(root, f"{job_key}-{uuid.uuid4().hex[:8]}")
+        logger.info(f"Segment job {job_key[:12]} is already running, rendering into {private_dir}")
+        manifest = cls(private_dir)
+        manifest._acquire()
+        return manifest
+
+    def _acquire(self) -> bool:
+        with _owned_lock:
+            if self.job_dir in _owned:
+                return False
+            lock_path = os.path.join(self.job_dir, '.owner.lock')
+            owner_file = open(lock_path, 'a')
+            if fcntl:
+                try:
+                    fcntl.flock(owner_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    # The previous owner may have cleared the directory while we waited to open it
+                    if os.fstat(owner_file.fileno()).st_ino != os.stat(lock_path).st_ino:
+                        raise OSError('job directory was replaced')
+                except OSError:
+                    owner_file.close()
+                    return False
+            _owned.add(self.job_dir)
+            self._owner_file = owner_file
+        # Only read once no other job can be writing it
+        self.data = self._load()
+        return True
+
+    def release(self):
+        """Give up ownership, keeping the segments for a later retry"""
+        with _owned_lock:
+            if self._owner_file is None:
+                return
+            _owned.discard(self.job_dir)
+            self._owner_file.close()  # Closing drops the flock
+            self._owner_file = None
+
+    @staticmethod
+    def job_key(prompt_hashes: List[str]) -> str:
+        """Stable job identifier derived from the ordered segment prompt hashes"""
+        return hashlib.sha256('|'.join(prompt_hashes).encode('utf-8')).hexdigest()[:32]
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'segments': {}}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable segment manifest {self.path}: {e}")
+            return {'segments': {}}
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def completed_path(self, segment_num: int, prompt_hash: str) -> Optional[str]:
+        """Path of a finished segment if it matches the prompt and its checksum still verifies"""
+        entry = self.data['segments'].get(str(segment_num))
+        if not entry or entry.get('prompt_hash') != prompt_hash:
+            return None
+
+        path = entry.get('path')
+        if not path or not os.path.exists(path):
+            return None
+        if file_checksum(path) != entry.get('checksum'):
+            logger.warning(f"Segment {segment_num} checksum mismatch, re-rendering")
+            return None
+        return path
+
+    def record(self, segment_num: int, path: str, prompt_hash: str):
+        """Mark a segment as completed"""
+        checksum = file_checksum(path)
+        with self._lock:
+            self.data['segments'][str(segment_num)] = {
+                'path': path,
+                'prompt_hash': prompt_hash,
+                'checksum': checksum,
+                'completed_at': datetime.now().isoformat()
+            }
+            self._save()
+
+    def clear(self):
+        """Remove the job directory once the final video has been produced"""
+        shutil.rmtree(self.job_dir, ignore_errors=True)
+        self.release()
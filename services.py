@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Service Registry
+Process-wide, long-lived integration clients for the web app: storage (and Google
+Sheets behind it) is connected once and shared by request threads, and the
+service-account token is refreshed in the background so requests never wait on it
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from loguru import logger
+from integrations import load_auth_request
+from storage import Storage
+from video_automation import VideoAutomation
+
+
+class ServiceRegistry:
+    """Builds the shared VideoAutomation on first use and hands it to request threads"""
+
+    def __init__(self, refresh_margin_seconds: Optional[int] = None):
+        # Refresh this long before the token expires
+        self.refresh_margin = refresh_margin_seconds or int(os.getenv('SHEETS_TOKEN_REFRESH_MARGIN_SECONDS', '300'))
+        self._automation: Optional[VideoAutomation] = None
+        self._lock = threading.RLock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def automation(self) -> VideoAutomation:
+        """The shared VideoAutomation with its storage backend connected"""
+        with self._lock:
+            if self._automation is None:
+                # YouTube OAuth is left to the scheduler/CLI - a web request must never start a consent flow
+                automation = VideoAutomation(skip_external_setup=True)
+                automation.setup_storage()
+                self._automation = automation
+                self._start_refresher()
+                logger.info(f"Connected shared {type(automation.storage).__name__}")
+            return self._automation
+
+    def storage(self) -> Storage:
+        """The shared Topics/Published/Scheduled store"""
+        return self.automation().storage
+
+    def reset(self):
+        """Drop every client so the next request reconnects from scratch"""
+        with self._lock:
+            self._automation = None
+
+    def _start_refresher(self):
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._refresher = threading.Thread(target=self._refresh_loop, name='sheets-token-refresh', daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            self._stop.wait(self._seconds_until_refresh())
+            if self._stop.is_set():
+                return
+            self.refresh_token()
+
+    def _seconds_until_refresh(self) -> float:
+        with self._lock:
+            creds = self._automation.sheets_credentials if self._automation else None
+        expiry = getattr(creds, 'expiry', None)
+        if not creds or not creds.token or expiry is None:
+            # Not fetched yet (first API call does that) - check again shortly
+            return 60
+        # google-auth keeps expiry as naive UTC
+        remaining = (expiry - timedelta(seconds=self.refresh_margin) - datetime.utcnow()).total_seconds()
+        return max(remaining, 5)
+
+    def refresh_token(self):
+        """Refresh the service-account token ahead of expiry"""
+        with self._lock:
+            creds = self._automation.sheets_credentials if self._automation else None
+        if creds is None:
+            return
+        try:
+            creds.refresh(load_auth_request()())
+            logger.debug(f"Refreshed Google Sheets token, valid until {creds.expiry}")
+        except Exception as e:
+            # The client still refreshes on demand, so a failure here only costs latency
+            logger.warning(f"Background Google Sheets token refresh failed: {e}")
+
+    def shutdown(self):
+        """Stop the background refresher"""
+        self._stop.set()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_services() -> ServiceRegistry:
+    """Get the process-wide service registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ServiceRegistry()
+    return _registry
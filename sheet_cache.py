@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Worksheet Snapshot Cache
+Read-through cache of whole-worksheet reads. A snapshot is served for a short TTL
+and dropped whenever this process writes to that worksheet; optionally, an expired
+snapshot is revalidated against the spreadsheet's Drive modifiedTime instead of
+being re-read
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from integrations import load_gspread
+
+# Needed on the Sheets credentials for revision checks
+DRIVE_METADATA_SCOPE = 'https://www.googleapis.com/auth/drive.metadata.readonly'
+
+
+class _Snapshot:
+    __slots__ = ('values', 'records', 'fetched_at', 'revision')
+
+    def __init__(self, values: List[List[str]], revision: Optional[str]):
+        self.values = values
+        self.records = None
+        self.fetched_at = time.monotonic()
+        self.revision = revision
+
+
+class SheetSnapshotCache:
+    """Thread-safe worksheet snapshots keyed by spreadsheet and worksheet id"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, revision_check: Optional[bool] = None):
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv('SHEET_CACHE_TTL_SECONDS', '15'))
+        if revision_check is None:
+            revision_check = os.getenv('SHEET_CACHE_REVISION_CHECK', 'false').lower() == 'true'
+        self.revision_check = revision_check
+        self._snapshots: Dict[Tuple, _Snapshot] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    @staticmethod
+    def _key(worksheet) -> Tuple:
+        return (getattr(worksheet, 'spreadsheet_id', None), worksheet.id)
+
+    def values(self, worksheet, max_age: Optional[float] = None) -> List[List[str]]:
+        """
+        Every row of the worksheet, like get_all_values().
+
+        max_age overrides the TTL for this call; pass 0 to force a fresh read
+        (which also refreshes the snapshot), e.g. before a write based on row numbers.
+        """
+        return self._snapshot(worksheet, max_age).values
+
+    def records(self, worksheet, max_age: Optional[float] = None) -> List[Dict]:
+        """Rows as header-keyed dicts, numericised the same way as get_all_records()"""
+        snapshot = self._snapshot(worksheet, max_age)
+        if snapshot.records is None:
+            snapshot.records = self._to_records(snapshot.values)
+        return snapshot.records
+
+    def invalidate(self, worksheet):
+        """Forget the snapshot after this process wrote to the worksheet"""
+        with self._lock:
+            self._snapshots.pop(self._key(worksheet), None)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'snapshots': len(self._snapshots),
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated
+            }
+
+    def _snapshot(self, worksheet, max_age: Optional[float]) -> _Snapshot:
+        key = self._key(worksheet)
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is not None and max_age > 0:
+            if time.monotonic() - snapshot.fetched_at <= max_age:
+                with self._lock:
+                    self.hits += 1
+                return snapshot
+            # Expired - one tiny Drive metadata call can still prove nothing changed
+            if self.revision_check and snapshot.revision is not None:
+                if self._revision(worksheet) == snapshot.revision:
+                    snapshot.fetched_at = time.monotonic()
+                    with self._lock:
+                        self.revalidated += 1
+                    return snapshot
+
+        # Read the revision first so a write landing mid-read makes the snapshot look stale, not fresh
+        revision = self._revision(worksheet) if self.revision_check else None
+        snapshot = _Snapshot(worksheet.get_all_values(), revision)
+        with self._lock:
+            self.misses += 1
+            self._snapshots[key] = snapshot
+        return snapshot
+
+    @staticmethod
+    def _revision(worksheet) -> Optional[str]:
+        try:
+            return worksheet.spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            logger.debug(f"Sheet revision check unavailable: {e}")
+            return None
+
+    @staticmethod
+    def _to_records(values: List[List[str]]) -> List[Dict]:
+        if not values or values == [[]]:
+            return []
+        utils = load_gspread().utils
+        keys, rows = values[0], values[1:]
+        width = len(keys)
+        # get_all_records pads short rows to the header width before numericising
+        rows = [row + [''] * (width - len(row)) if len(row) < width else row for row in rows]
+        return utils.to_records(keys, [utils.numericise_all(row) for row in rows])
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_sheet_cache() -> SheetSnapshotCache:
+    """Get the process-wide worksheet snapshot cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SheetSnapshotCache()
+    return _cache
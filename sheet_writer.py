@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Sheets Write Coalescer
+Queues cell updates and row appends and flushes them together: all cell updates
+for a spreadsheet go out as one values batchUpdate, appends as one append_rows
+per worksheet. Flushes run on a short interval and whenever a job finishes, and
+rate-limit errors are retried with backoff
+"""
+
+import atexit
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from integrations import load_gspread
+from sheet_cache import get_sheet_cache
+
+# Quota and transient server errors worth retrying
+RETRY_STATUS_CODES = {429, 500, 502, 503}
+
+
+class _Pending:
+    """Queued writes for one worksheet"""
+    __slots__ = ('worksheet', 'cells', 'rows')
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.cells: Dict[Tuple[int, int], object] = {}  # (row, col) -> latest value
+        self.rows: List[List] = []
+
+
+class SheetWriter:
+    """Thread-safe write-behind queue for gspread worksheets"""
+
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+        manual: bool = False
+    ):
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv('SHEET_WRITE_FLUSH_INTERVAL', '2'))
+        # Manual: writes wait for an explicit flush() - no background flusher, no inline writes
+        self.manual = manual
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('SHEET_WRITE_MAX_RETRIES', '5'))
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else float(os.getenv('SHEET_WRITE_BACKOFF_SECONDS', '1'))
+        self._pending: Dict[Tuple, _Pending] = {}
+        self._lock = threading.Lock()
+        # Only one flush talks to Google at a time, so queued writes land in order
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.writes_queued = 0
+        self.requests_sent = 0
+
+    def update_cell(self, worksheet, row: int, col: int, value):
+        """Queue worksheet.update_cell(row, col, value); a later value for the same cell wins"""
+        with self._lock:
+            self._entry(worksheet).cells[(row, col)] = value
+            self.writes_queued += 1
+        self._schedule()
+
+    def append_row(self, worksheet, values: List):
+        """Queue worksheet.append_row(values)"""
+        with self._lock:
+            self._entry(worksheet).rows.append(list(values))
+            self.writes_queued += 1
+        self._schedule()
+
+    def flush(self, worksheet=None, raise_errors: bool = True, requeue: bool = True):
+        """
+        Send queued writes now - for one worksheet or all of them.
+
+        Writes that still fail after retries are put back in the queue
+        (without overriding newer values) and the error is raised, or only
+        logged with raise_errors=False - the background flusher retries them.
+        With requeue=False failed writes are dropped instead, for callers that
+        recompute them.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if worksheet is None:
+                    batch = list(self._pending.values())
+                    self._pending = {}
+                else:
+                    entry = self._pending.pop(self._key(worksheet), None)
+                    batch = [entry] if entry else []
+            if not batch:
+                return
+            try:
+                self._send(batch, requeue)
+            except Exception as e:
+                if raise_errors:
+                    raise
+                logger.error(f"Sheets flush failed, {self.pending()} writes stay queued: {e}")
+                if not self.manual:
+                    self._wake.set()
+
+    def delete_rows(self, worksheet, rows: List[int]) -> int:
+        """
+        Delete the given 1-based rows in one batchUpdate.
+
+        Contiguous rows collapse into one deleteDimension range and ranges are
+        deleted bottom-up, so earlier deletes never shift the rows of later ones.
+        Writes queued for the worksheet are flushed first - they address rows by number.
+        Returns the number of ranges deleted.
+        """
+        self.flush(worksheet)
+        runs = []
+        for row in sorted(set(rows), reverse=True):
+            if runs and runs[-1][0] == row + 1:
+                runs[-1][0] = row
+            else:
+                runs.append([row, row])
+        if not runs:
+            return 0
+
+        body = {
+            'requests': [
+                {
+                    'deleteDimension': {
+                        'range': {
+                            'sheetId': worksheet.id,
+                            'dimension': 'ROWS',
+                            'startIndex': start - 1,  # 0-based, end exclusive
+                            'endIndex': end
+                        }
+                    }
+                }
+                for start, end in runs
+            ]
+        }
+        with self._flush_lock:
+            try:
+                self._with_backoff(worksheet.spreadsheet.batch_update, body)
+            finally:
+                get_sheet_cache().invalidate(worksheet)
+        return len(runs)
+
+    def discard(self):
+        """Drop every queued write - for callers that recompute them on their next pass"""
+        with self._lock:
+            self._pending = {}
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(entry.cells) + len(entry.rows) for entry in self._pending.values())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'writes_queued': self.writes_queued,
+                'requests_sent': self.requests_sent,
+                'pending': sum(len(entry.cells) + len(entry.rows) for entry in self._pending.values())
+            }
+
+    @staticmethod
+    def _key(worksheet) -> Tuple:
+        return (worksheet.spreadsheet_id, worksheet.id)
+
+    def _entry(self, worksheet) -> _Pending:
+        key = self._key(worksheet)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = _Pending(worksheet)
+        return entry
+
+    def _schedule(self):
+        if self.manual:
+            return
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, name='sheet-writer', daemon=True)
+                self._flusher.start()
+        self._wake.set()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait()
+            # Let writes that arrive together (e.g. a status plus its URL) share one request
+            time.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Background Sheets flush failed, will retry: {e}")
+                self._wake.set()
+
+    def _send(self, batch: List[_Pending], requeue: bool = True):
+        utils = load_gspread().utils
+        by_spreadsheet: Dict[str, List[_Pending]] = {}
+        for entry in batch:
+            by_spreadsheet.setdefault(entry.worksheet.spreadsheet_id, []).append(entry)
+
+        failed: List[_Pending] = []
+        error = None
+        for entries in by_spreadsheet.values():
+            data = [
+                {
+                    'range': utils.absolute_range_name(entry.worksheet.title, utils.rowcol_to_a1(row, col)),
+                    'values': [[value]]
+                }
+                for entry in entries
+                for (row, col), value in entry.cells.items()
+            ]
+            try:
+                if data:
+                    # Same value input option as update_cell
+                    body = {'valueInputOption': 'USER_ENTERED', 'data': data}
+                    self._with_backoff(entries[0].worksheet.spreadsheet.values_batch_update, body)
+                    for entry in entries:
+                        entry.cells = {}
+            except Exception as e:
+                failed.extend(entries)
+                error = e
+                continue
+
+            for entry in entries:
+                try:
+                    if entry.rows:
+                        self._with_backoff(entry.worksheet.append_rows, entry.rows)
+                        entry.rows = []
+                except Exception as e:
+                    failed.append(entry)
+                    error = e
+
+        for entry in batch:
+            get_sheet_cache().invalidate(entry.worksheet)
+
+        if failed:
+            if requeue:
+                self._requeue(failed)
+            raise error
+
+    def _with_backoff(self, call, *args):
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = call(*args)
+                with self._lock:
+                    self.requests_sent += 1
+                return result
+            except load_gspread().exceptions.APIError as e:
+                if e.code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    raise
+                # Exponential backoff with jitter, as the Sheets quota docs recommend
+                delay = self.backoff_seconds * (2 ** attempt) + random.uniform(0, self.backoff_seconds)
+                logger.warning(f"Sheets write returned {e.code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _requeue(self, failed: List[_Pending]):
+        with self._lock:
+            for entry in failed:
+                current = self._entry(entry.worksheet)
+                # Values queued since the failed flush are newer - keep them
+                current.cells = {**entry.cells, **current.cells}
+                current.rows = entry.rows + current.rows
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_sheet_writer() -> SheetWriter:
+    """Get the process-wide Sheets write coalescer"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SheetWriter()
+            # Cron runs exit right after the last job - don't drop its status writes
+            atexit.register(_flush_at_exit)
+    return _writer
+
+
+def _flush_at_exit():
+    try:
+        _writer.flush()
+    except Exception as e:
+        logger.error(f"Failed to flush pending Sheets writes at exit: {e}")
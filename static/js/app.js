@@ -522,25 +522,12 @@ async function generateVideo() {
     document.getElementById('progressText').textContent = 'Initializing...';
     updateProgressBar(0);
     
-    // Animate to 10% after a brief delay
-    setTimeout(() => {
-        document.getElementById('progressText').textContent = 'Generating script with Grok...';
-        updateProgressBar(10);
-    }, 300);
+    document.getElementById('progressDetail').textContent = '';
     
     // Clear any existing progress timeouts
     progressTimeouts.forEach(timeout => clearTimeout(timeout));
     progressTimeouts = [];
     
-    // Simulate progress during script generation
-    progressTimeouts.push(setTimeout(() => updateProgressBar(30), 1000));
-    progressTimeouts.push(setTimeout(() => updateProgressBar(50), 2000));
-    progressTimeouts.push(setTimeout(() => {
-        document.getElementById('progressText').textContent = 'Analyzing content...';
-        updateProgressBar(70);
-    }, 3000));
-    progressTimeouts.push(setTimeout(() => updateProgressBar(85), 4000));
-    
     try {
         // Store data for later
         pendingVideoData = {
@@ -568,13 +555,8 @@ async function generateVideo() {
             });
         }
         
-        // Request script generation with images
-        const response = await fetch('/api/generate-script', {
-            method: 'POST',
-            body: scriptFormData
-        });
-        
-        const data = await response.json();
+        // Request script generation with images, showing fields as Grok streams them
+        const data = await streamScript(scriptFormData, 'progressText', 'progressDetail', updateProgressBar);
         console.log('Generate script response:', data); // Debug log
         
         if (data.success) {
@@ -597,6 +579,8 @@ async function generateVideo() {
             setTimeout(() => {
                 document.getElementById('progressSection').style.display = 'none';
                 updateProgressBar(0); // Reset for next phase
+                // Script is kept server-side, renders only need its ID
+                pendingVideoData.scriptId = data.script_id;
                 // Show prompt preview modal
                 showPromptPreview(data.script_data);
             }, 800);
@@ -610,6 +594,101 @@ async function generateVideo() {
     }
 }
 
+// Human-readable labels for streamed script fields
+const SCRIPT_FIELD_LABELS = {
+    title: 'Title',
+    description: 'Description',
+    script: 'Narration',
+    visual_prompts: 'Visual prompts',
+    camera_work: 'Camera work',
+    lighting: 'Lighting',
+    style_keywords: 'Style keywords',
+    hook: 'Hook',
+    segments: 'Segments'
+};
+
+function describeStreamedField(field, value) {
+    const label = SCRIPT_FIELD_LABELS[field] || field;
+    if (typeof value === 'string') {
+        return `${label}: ${value.length > 120 ? value.substring(0, 120) + '...' : value}`;
+    }
+    if (Array.isArray(value) && value.every(item => typeof item === 'string')) {
+        return `${label}: ${value.join(', ')}`;
+    }
+    return `${label} ready`;
+}
+
+// Generate a script via the streaming endpoint, updating progress as each field arrives.
+// Resolves to the same {success, script_data, script_id} shape as /api/generate-script.
+async function streamScript(formData, textId, detailId, setProgress) {
+    const progressText = document.getElementById(textId);
+    const progressDetail = document.getElementById(detailId);
+    progressText.textContent = 'Generating script with Grok...';
+    setProgress(5);
+    
+    const response = await fetch('/api/generate-script/stream', {
+        method: 'POST',
+        body: formData
+    });
+    
+    // Validation errors come back as plain JSON before any streaming starts
+    const contentType = response.headers.get('Content-Type') || '';
+    if (!contentType.includes('text/event-stream')) {
+        return await response.json();
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let expected = 1;
+    let received = 0;
+    let result = null;
+    
+    const handleEvent = (event, payload) => {
+        if (event === 'start') {
+            expected = payload.fields.length + (payload.segments > 1 ? payload.segments : 0);
+            setProgress(10);
+        } else if (event === 'field' || event === 'segment') {
+            received += 1;
+            progressText.textContent = event === 'segment'
+                ? `Writing segment ${payload.index + 1}...`
+                : 'Writing script...';
+            if (event === 'field') {
+                progressDetail.textContent = describeStreamedField(payload.field, payload.value);
+            }
+            setProgress(Math.min(95, 10 + Math.round(85 * received / expected)));
+        } else if (event === 'script') {
+            result = {success: true, script_data: payload.script_data, script_id: payload.script_id, cached: payload.cached};
+        } else if (event === 'error') {
+            result = {success: false, error: payload.error};
+        }
+    };
+    
+    while (true) {
+        const {value, done} = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, {stream: true});
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.substring(0, boundary);
+            buffer = buffer.substring(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.substring(6).trim();
+                else if (line.startsWith('data:')) data += line.substring(5).trim();
+            });
+            if (data) handleEvent(event, JSON.parse(data));
+        }
+    }
+    
+    progressDetail.textContent = '';
+    return result || {success: false, error: 'Script stream ended unexpectedly'};
+}
+
 function showPromptPreview(scriptData) {
     try {
         console.log('Script data received:', scriptData); // Debug log
@@ -767,7 +846,13 @@ async function proceedWithGeneration() {
         formData.append('useYoutube', pendingVideoData.useYoutube);
         formData.append('youtubeClientSecrets', pendingVideoData.youtubeClientSecrets);
         formData.append('duration', pendingVideoData.duration);
-        formData.append('scriptData', JSON.stringify(pendingVideoData.scriptData));
+        if (pendingVideoData.scriptId) {
+            // Server already has the script; only send the (possibly edited) prompt
+            formData.append('scriptId', pendingVideoData.scriptId);
+            formData.append('visualPrompts', pendingVideoData.scriptData.visual_prompts);
+        } else {
+            formData.append('scriptData', JSON.stringify(pendingVideoData.scriptData));
+        }
         
         // Append multiple images
         if (pendingVideoData.imageFiles && pendingVideoData.imageFiles.length > 0) {
@@ -814,7 +899,11 @@ async function checkJobStatus() {
             document.getElementById('progressText').textContent = job.progress;
             
             // Update progress bar with smoother transitions
-            if (job.progress.includes('Initializing')) {
+            if (job.segments && job.segments.length && job.progress.includes('segments')) {
+                // Multi-segment render: advance with each finished segment
+                const done = job.segments.filter(segment => segment.status === 'completed').length;
+                updateProgressBar(45 + Math.round(40 * done / job.segments.length));
+            } else if (job.progress.includes('Initializing')) {
                 updateProgressBar(5);
             } else if (job.progress.includes('Generating script')) {
                 updateProgressBar(15);
@@ -1066,25 +1155,12 @@ async function scheduleVideo() {
     document.getElementById('scheduleProgressText').textContent = 'Initializing...';
     updateScheduleProgressBar(0);
     
-    // Animate progress
-    setTimeout(() => {
-        document.getElementById('scheduleProgressText').textContent = 'Generating script preview with Grok...';
-        updateScheduleProgressBar(10);
-    }, 300);
+    document.getElementById('scheduleProgressDetail').textContent = '';
     
     // Clear any existing progress timeouts
     progressTimeouts.forEach(timeout => clearTimeout(timeout));
     progressTimeouts = [];
     
-    // Simulate progress during script generation
-    progressTimeouts.push(setTimeout(() => updateScheduleProgressBar(30), 1000));
-    progressTimeouts.push(setTimeout(() => updateScheduleProgressBar(50), 2000));
-    progressTimeouts.push(setTimeout(() => {
-        document.getElementById('scheduleProgressText').textContent = 'Analyzing content...';
-        updateScheduleProgressBar(70);
-    }, 3000));
-    progressTimeouts.push(setTimeout(() => updateScheduleProgressBar(85), 4000));
-    
     try {
         // Create FormData to send images
         const scriptFormData = new FormData();
@@ -1100,13 +1176,8 @@ async function scheduleVideo() {
             });
         }
         
-        // Generate script preview using the same endpoint
-        const response = await fetch('/api/generate-script', {
-            method: 'POST',
-            body: scriptFormData
-        });
-        
-        const data = await response.json();
+        // Generate script preview using the same streaming endpoint
+        const data = await streamScript(scriptFormData, 'scheduleProgressText', 'scheduleProgressDetail', updateScheduleProgressBar);
         
         if (data.success) {
             // Clear any pending progress timeouts
@@ -0,0 +1,758 @@
+#!/usr/bin/env python3
+"""
+Storage Backends
+Topics, Published and Scheduled behind one interface: Google Sheets (the default),
+or a local SQLite database with indexes on status and scheduled time, optionally
+kept in two-way sync with the spreadsheet for people who edit there
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from integrations import load_gspread
+from script_blobs import get_script_blobs
+from sheet_cache import get_sheet_cache
+from sheet_writer import SheetWriter, get_sheet_writer
+from topic_cursor import get_topic_cursor
+
+try:
+    import fcntl
+except ImportError:  # Windows - every process mirrors, so run only one there
+    fcntl = None
+
+SCHEDULED_HEADERS = ['ID', 'Topic', 'Scheduled Time', 'Duration', 'Style', 'Status', 'Created At', 'Video ID', 'Script Data']
+
+# Sheet header -> SQLite column, in sheet column order
+TOPIC_COLUMNS = [('ID', 'id'), ('Status', 'status'), ('Topic', 'topic')]
+SCHEDULED_COLUMNS = list(zip(SCHEDULED_HEADERS, [
+    'id', 'topic', 'scheduled_time', 'duration', 'style', 'status', 'created_at', 'video_id', 'script_data'
+]))
+PUBLISHED_COLUMNS = ['id', 'topic', 'title', 'url', 'published_at', 'views']
+
+STATUS_COLUMN = {'topics': 2, 'scheduled': 6}
+VIDEO_ID_COLUMN = 8
+
+
+def storage_backend() -> str:
+    return os.getenv('STORAGE_BACKEND', 'sheets').lower()
+
+
+def sheets_mirror_enabled() -> bool:
+    """Whether a SQLite backend should keep the spreadsheet in sync"""
+    return storage_backend() == 'sqlite' and os.getenv('STORAGE_SHEETS_MIRROR', 'true').lower() == 'true'
+
+
+def _id_numbers(ids) -> List[int]:
+    """Numeric part of IDs like 001 or SCH0004"""
+    digits = [''.join(ch for ch in str(value) if ch.isdigit()) for value in ids]
+    return [int(value) for value in digits if value]
+
+
+def parse_time(value) -> Optional[datetime]:
+    """Scheduled Time cell -> local naive datetime; the UI sends UTC ('...Z'), older rows are naive local"""
+    if not isinstance(value, datetime):
+        value = str(value).strip()
+        # fromisoformat only accepts a 'Z' suffix from Python 3.11 - the Docker image runs 3.9
+        if value.endswith(('Z', 'z')):
+            value = f"{value[:-1]}+00:00"
+    try:
+        parsed = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+class Storage(ABC):
+    """What the app, scheduler and automation need from Topics, Published and Scheduled"""
+
+    @abstractmethod
+    def list_topics(self) -> List[Dict]:
+        """Topics as records keyed by sheet header"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def next_topic(self) -> Optional[Dict]:
+        """First topic that is not Published: {'row', 'topic', 'id'}"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_topic(self, topic: str) -> str:
+        """Append a topic and return its new ID"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_topic_status(self, topic_data: Dict, status: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_published(self, values: List):
+        """Append a Published row: ID, Topic, Title, URL, Published At, Views"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_scheduled(self) -> List[Dict]:
+        """Scheduled videos as records keyed by sheet header"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def due_scheduled(self, now: datetime) -> List[Dict]:
+        """Pending scheduled records due at or before now, each with its 'row'"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def schedule_index(self) -> List[Dict]:
+        """Every Pending video as just {'id', 'row', 'scheduled_time'} - a narrow read for the scheduler daemon"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_scheduled(self, video_id: str, row: Optional[int] = None) -> Optional[Dict]:
+        """One scheduled record, read fresh, with its 'row'; row is a hint for where to look"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_scheduled(self, topic: str, scheduled_time: str, duration, style: str, script_data: str) -> str:
+        """Schedule a video and return its new ID"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_scheduled_status(self, video_data: Dict, status: str, video_id: Optional[str] = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def cancel_scheduled(self, video_id: str) -> bool:
+        """Mark a scheduled video Cancelled; False if there is no such video"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear_cancelled(self) -> int:
+        """Remove every Cancelled video and return how many were removed"""
+        raise NotImplementedError
+
+    def flush(self, raise_errors: bool = True):
+        """Make queued writes durable - called when a job finishes"""
+
+    @staticmethod
+    def _release_scripts(scripts: List[Tuple[bool, str]]):
+        """Drop the script blobs of removed scheduled rows: (removed, Script Data) pairs"""
+        try:
+            released = get_script_blobs().release(
+                [value for removed, value in scripts if removed],
+                keep=[value for removed, value in scripts if not removed]
+            )
+            if released:
+                logger.info(f"Removed {released} unreferenced script blobs")
+        except OSError as e:
+            # Leftover blobs only cost disk space - never fail the clear over them
+            logger.warning(f"Could not remove script blobs: {e}")
+
+
+class SheetsStorage(Storage):
+    """Google Sheets, with snapshot reads, coalesced writes and the Topics cursor"""
+
+    def __init__(self, spreadsheet, topics_sheet=None, videos_sheet=None):
+        self.spreadsheet = spreadsheet
+        self.topics_sheet = topics_sheet or spreadsheet.worksheet('Topics')
+        self.videos_sheet = videos_sheet or spreadsheet.worksheet('Published')
+        self._scheduled_sheet = None
+        self._lock = threading.Lock()
+
+    def scheduled_sheet(self, create: bool = False):
+        """Cached Scheduled worksheet handle; created with its headers on first use if asked"""
+        with self._lock:
+            if self._scheduled_sheet is None:
+                try:
+                    self._scheduled_sheet = self.spreadsheet.worksheet('Scheduled')
+                except Exception:
+                    if not create:
+                        raise
+                    sheet = self.spreadsheet.add_worksheet(title='Scheduled', rows=100, cols=len(SCHEDULED_HEADERS) + 1)
+                    sheet.append_row(SCHEDULED_HEADERS)
+                    self._scheduled_sheet = sheet
+            return self._scheduled_sheet
+
+    def _optional_scheduled_sheet(self):
+        try:
+            return self.scheduled_sheet()
+        except Exception:
+            # No Scheduled sheet yet (or it was deleted - don't keep a stale handle)
+            with self._lock:
+                self._scheduled_sheet = None
+            return None
+
+    def list_topics(self) -> List[Dict]:
+        return get_sheet_cache().records(self.topics_sheet)
+
+    def next_topic(self) -> Optional[Dict]:
+        return get_topic_cursor(self.topics_sheet).next_topic()
+
+    def add_topic(self, topic: str) -> str:
+        return get_topic_cursor(self.topics_sheet).add_topic(topic)
+
+    def set_topic_status(self, topic_data: Dict, status: str):
+        get_sheet_writer().update_cell(self.topics_sheet, topic_data['row'], STATUS_COLUMN['topics'], status)
+
+    def add_published(self, values: List):
+        get_sheet_writer().append_row(self.videos_sheet, values)
+
+    def list_scheduled(self) -> List[Dict]:
+        sheet = self._optional_scheduled_sheet()
+        if sheet is None:
+            return []
+        try:
+            return get_sheet_cache().records(sheet)
+        except Exception:
+            with self._lock:
+                self._scheduled_sheet = None
+            return []
+
+    def due_scheduled(self, now: datetime) -> List[Dict]:
+        sheet = self._optional_scheduled_sheet()
+        if sheet is None:
+            return []
+        due = []
+        for idx, record in enumerate(get_sheet_cache().records(sheet), start=2):  # Start at 2 to account for header
+            if record.get('Status') == 'Pending' and record.get('Topic'):
+                scheduled_time = parse_time(record.get('Scheduled Time'))
+                if scheduled_time and scheduled_time <= now:
+                    due.append(dict(record, row=idx))
+        return due
+
+    def schedule_index(self) -> List[Dict]:
+        sheet = self._optional_scheduled_sheet()
+        if sheet is None:
+            return []
+        # ID, Scheduled Time and Status columns only, in one batchGet - a few bytes per row
+        # instead of whole rows with their script data
+        ids, times, statuses = (list(value_range) for value_range in sheet.batch_get(['A2:A', 'C2:C', 'F2:F']))
+        index = []
+        for offset, id_cell in enumerate(ids):
+            status = statuses[offset] if offset < len(statuses) else []
+            if not id_cell or not status or status[0] != 'Pending':
+                continue
+            scheduled_time = parse_time(times[offset][0]) if offset < len(times) and times[offset] else None
+            if scheduled_time:
+                index.append({'id': id_cell[0], 'row': offset + 2, 'scheduled_time': scheduled_time})
+        return index
+
+    def get_scheduled(self, video_id: str, row: Optional[int] = None) -> Optional[Dict]:
+        sheet = self.scheduled_sheet()
+        if row is not None:
+            values = sheet.get(f"A{row}:I{row}")
+            if values and values[0] and values[0][0] == video_id:
+                return self._scheduled_record(values[0], row)
+        # Rows moved (e.g. cancelled rows were cleared) - find it by ID
+        for idx, values in enumerate(get_sheet_cache().values(sheet, max_age=0)[1:], start=2):
+            if values and values[0] == video_id:
+                return self._scheduled_record(values, idx)
+        return None
+
+    @staticmethod
+    def _scheduled_record(values: List[str], row: int) -> Dict:
+        # Same shape as get_all_records: numericised, keyed by header
+        values = (list(values) + [''] * len(SCHEDULED_HEADERS))[:len(SCHEDULED_HEADERS)]
+        record = dict(zip(SCHEDULED_HEADERS, load_gspread().utils.numericise_all(values)))
+        return dict(record, row=row)
+
+    def add_scheduled(self, topic: str, scheduled_time: str, duration, style: str, script_data: str) -> str:
+        sheet = self.scheduled_sheet(create=True)
+        # Fresh read - a stale row count would reuse an ID; so would the row count
+        # alone once cancelled rows have been cleared
+        existing_ids = [row[0] for row in get_sheet_cache().values(sheet, max_age=0)[1:] if row and row[0]]
+        next_id = f"SCH{max([len(existing_ids)] + _id_numbers(existing_ids)) + 1:04d}"
+        sheet.append_row([
+            next_id, topic, scheduled_time, duration, style, 'Pending',
+            datetime.now().isoformat(),
+            '',  # Video ID will be filled when created
+            script_data
+        ])
+        get_sheet_cache().invalidate(sheet)
+        return next_id
+
+    def set_scheduled_status(self, video_data: Dict, status: str, video_id: Optional[str] = None):
+        sheet = self.scheduled_sheet()
+        writer = get_sheet_writer()
+        writer.update_cell(sheet, video_data['row'], STATUS_COLUMN['scheduled'], status)
+        if video_id is not None:
+            writer.update_cell(sheet, video_data['row'], VIDEO_ID_COLUMN, video_id)
+
+    def cancel_scheduled(self, video_id: str) -> bool:
+        sheet = self.scheduled_sheet()
+        # Fresh, row numbers must be current
+        all_values = get_sheet_cache().values(sheet, max_age=0)
+        for idx, row in enumerate(all_values[1:], start=2):  # Skip header
+            if row and row[0] == video_id:
+                sheet.update_cell(idx, STATUS_COLUMN['scheduled'], 'Cancelled')
+                get_sheet_cache().invalidate(sheet)
+                return True
+        return False
+
+    def clear_cancelled(self) -> int:
+        sheet = self.scheduled_sheet()
+        # Fresh, rows are deleted by number
+        all_values = get_sheet_cache().values(sheet, max_age=0)
+        cancelled_rows = [
+            idx for idx, row in enumerate(all_values[1:], start=2)  # Skip header
+            if len(row) > 5 and row[5] == 'Cancelled'  # Status column is index 5
+        ]
+        # Delete only the cancelled rows, in place - surviving rows are never rewritten,
+        # so a scheduler update landing meanwhile is not lost
+        if cancelled_rows:
+            get_sheet_writer().delete_rows(sheet, cancelled_rows)
+            cancelled = set(cancelled_rows)
+            scripts = [(idx in cancelled, row[8]) for idx, row in enumerate(all_values[1:], start=2) if len(row) > 8]
+            self._release_scripts(scripts)
+        return len(cancelled_rows)
+
+    def flush(self, raise_errors: bool = True):
+        get_sheet_writer().flush(raise_errors=raise_errors)
+
+
+class SQLiteStorage(Storage):
+    """
+    Local SQLite database. Pending topics and due videos come from indexes, and
+    every row carries updated_at/synced_at so a SheetsMirror can find local changes
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS topics (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT '',
+            topic TEXT NOT NULL DEFAULT '',
+            position INTEGER NOT NULL,
+            updated_at REAL NOT NULL,
+            synced_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_topics_pending ON topics(position) WHERE status != 'Published';
+        CREATE INDEX IF NOT EXISTS idx_topics_dirty ON topics(updated_at) WHERE synced_at IS NULL OR synced_at < updated_at;
+
+        CREATE TABLE IF NOT EXISTS scheduled (
+            id TEXT PRIMARY KEY,
+            topic TEXT NOT NULL DEFAULT '',
+            scheduled_time TEXT NOT NULL DEFAULT '',
+            duration TEXT NOT NULL DEFAULT '8',
+            style TEXT NOT NULL DEFAULT 'cinematic',
+            status TEXT NOT NULL DEFAULT 'Pending',
+            created_at TEXT NOT NULL DEFAULT '',
+            video_id TEXT NOT NULL DEFAULT '',
+            script_data TEXT NOT NULL DEFAULT '',
+            position INTEGER NOT NULL,
+            updated_at REAL NOT NULL,
+            synced_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_scheduled_due ON scheduled(status, scheduled_time);
+        CREATE INDEX IF NOT EXISTS idx_scheduled_dirty ON scheduled(updated_at) WHERE synced_at IS NULL OR synced_at < updated_at;
+
+        CREATE TABLE IF NOT EXISTS published (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT, topic TEXT, title TEXT, url TEXT, published_at TEXT, views INTEGER,
+            synced INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_published_unsynced ON published(seq) WHERE synced = 0;
+
+        -- Rows deleted locally that still exist in the Sheets mirror
+        CREATE TABLE IF NOT EXISTS tombstones (tbl TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY (tbl, id));
+
+        CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    """
+
+    COLUMNS = {'topics': TOPIC_COLUMNS, 'scheduled': SCHEDULED_COLUMNS}
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('SQLITE_PATH', 'data/video_automation.db')
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # One connection shared by request threads; web workers and the scheduler share the file
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+        self._lock = threading.RLock()
+        self.mirror: Optional['SheetsMirror'] = None
+
+    # Topics
+
+    def list_topics(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM topics ORDER BY position').fetchall()
+        return [self._record('topics', row) for row in rows]
+
+    def next_topic(self) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, topic FROM topics WHERE status != 'Published' ORDER BY position LIMIT 1"
+            ).fetchone()
+        return {'row': None, 'topic': row['topic'], 'id': row['id']} if row else None
+
+    def add_topic(self, topic: str) -> str:
+        with self._lock, self._conn:
+            topic_id = f"{self._next_number('topics'):03d}"
+            self._insert('topics', {'id': topic_id, 'status': '', 'topic': topic})
+        return topic_id
+
+    def set_topic_status(self, topic_data: Dict, status: str):
+        self._update('topics', str(topic_data['id']), status=status)
+
+    def add_published(self, values: List):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO published ({', '.join(PUBLISHED_COLUMNS)}) VALUES ({', '.join('?' * len(PUBLISHED_COLUMNS))})",
+                [str(value) if value is not None else '' for value in values[:len(PUBLISHED_COLUMNS)]]
+            )
+
+    # Scheduled
+
+    def list_scheduled(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM scheduled ORDER BY position').fetchall()
+        return [self._record('scheduled', row) for row in rows]
+
+    def due_scheduled(self, now: datetime) -> List[Dict]:
+        # ISO timestamps sort as text, so the (status, scheduled_time) index does the coarse
+        # filtering. Stored values may carry a UTC offset, so the bound allows a day of slack
+        # and parse_time makes the exact comparison below
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM scheduled WHERE status = 'Pending' AND scheduled_time <= ? AND topic != '' "
+                "ORDER BY scheduled_time",
+                ((now + timedelta(days=1)).isoformat(),)
+            ).fetchall()
+        due = []
+        for row in rows:
+            scheduled_time = parse_time(row['scheduled_time'])
+            if scheduled_time and scheduled_time <= now:
+                due.append(dict(self._record('scheduled', row), row=None))
+        return due
+
+    def schedule_index(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, scheduled_time FROM scheduled WHERE status = 'Pending'"
+            ).fetchall()
+        index = []
+        for row in rows:
+            scheduled_time = parse_time(row['scheduled_time'])
+            if scheduled_time:
+                index.append({'id': row['id'], 'row': None, 'scheduled_time': scheduled_time})
+        return index
+
+    def get_scheduled(self, video_id: str, row: Optional[int] = None) -> Optional[Dict]:
+        with self._lock:
+            found = self._conn.execute('SELECT * FROM scheduled WHERE id = ?', (video_id,)).fetchone()
+        return dict(self._record('scheduled', found), row=None) if found else None
+
+    def add_scheduled(self, topic: str, scheduled_time: str, duration, style: str, script_data: str) -> str:
+        with self._lock, self._conn:
+            video_id = f"SCH{self._next_number('scheduled'):04d}"
+            self._insert('scheduled', {
+                'id': video_id,
+                'topic': topic,
+                'scheduled_time': scheduled_time,
+                'duration': str(duration),
+                'style': style,
+                'status': 'Pending',
+                'created_at': datetime.now().isoformat(),
+                'video_id': '',
+                'script_data': script_data or ''
+            })
+        return video_id
+
+    def set_scheduled_status(self, video_data: Dict, status: str, video_id: Optional[str] = None):
+        fields = {'status': status}
+        if video_id is not None:
+            fields['video_id'] = video_id
+        self._update('scheduled', str(video_data['id']), **fields)
+
+    def cancel_scheduled(self, video_id: str) -> bool:
+        return self._update('scheduled', video_id, status='Cancelled')
+
+    def clear_cancelled(self) -> int:
+        with self._lock, self._conn:
+            # Rows the mirror already pushed must also go from the sheet
+            self._conn.execute(
+                "INSERT OR IGNORE INTO tombstones (tbl, id) "
+                "SELECT 'scheduled', id FROM scheduled WHERE status = 'Cancelled' AND synced_at IS NOT NULL"
+            )
+            scripts = [
+                (row['status'] == 'Cancelled', row['script_data'])
+                for row in self._conn.execute('SELECT status, script_data FROM scheduled')
+            ]
+            cursor = self._conn.execute("DELETE FROM scheduled WHERE status = 'Cancelled'")
+        self._release_scripts(scripts)
+        return cursor.rowcount
+
+    def flush(self, raise_errors: bool = True):
+        # Local writes are already durable; push them to the spreadsheet now if it is mirrored
+        if self.mirror is not None:
+            try:
+                self.mirror.sync_once()
+            except Exception as e:
+                if raise_errors:
+                    raise
+                logger.error(f"Sheets mirror sync failed, will retry: {e}")
+
+    # Mirror support
+
+    def dirty_rows(self, table: str) -> List[sqlite3.Row]:
+        """Rows changed locally since they were last synced"""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT * FROM {table} WHERE synced_at IS NULL OR synced_at < updated_at ORDER BY position"
+            ).fetchall()
+
+    def mark_synced(self, table: str, rows: List[sqlite3.Row]):
+        """Mark rows synced - unless they changed again meanwhile"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"UPDATE {table} SET synced_at = updated_at WHERE id = ? AND updated_at = ?",
+                [(row['id'], row['updated_at']) for row in rows]
+            )
+
+    def merge_remote(self, table: str, records: List[Dict]) -> int:
+        """
+        Apply rows edited in the spreadsheet. Rows with unsynced local changes keep
+        the local version (it is pushed next), and rows deleted locally stay deleted.
+        Returns the number of rows inserted or updated.
+        """
+        columns = [column for _, column in self.COLUMNS[table]]
+        changed = 0
+        now = time.time()
+        with self._lock, self._conn:
+            tombstoned = {row['id'] for row in self._conn.execute('SELECT id FROM tombstones WHERE tbl = ?', (table,))}
+            for record in records:
+                record_id = record.get('id')
+                if not record_id or record_id in tombstoned:
+                    continue
+                local = self._conn.execute(f'SELECT * FROM {table} WHERE id = ?', (record_id,)).fetchone()
+                if local is None:
+                    self._insert(table, record, synced=True)
+                    self._bump_counter(table, record_id)
+                    changed += 1
+                elif local['synced_at'] is not None and local['synced_at'] >= local['updated_at']:
+                    updates = {column: record.get(column, '') for column in columns[1:] if record.get(column, '') != local[column]}
+                    if updates:
+                        assignments = ', '.join(f'{column} = ?' for column in updates)
+                        self._conn.execute(
+                            f'UPDATE {table} SET {assignments}, updated_at = ?, synced_at = ? WHERE id = ?',
+                            list(updates.values()) + [now, now, record_id]
+                        )
+                        changed += 1
+        return changed
+
+    def unsynced_published(self) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute('SELECT * FROM published WHERE synced = 0 ORDER BY seq').fetchall()
+
+    def mark_published_synced(self, rows: List[sqlite3.Row]):
+        with self._lock, self._conn:
+            self._conn.executemany('UPDATE published SET synced = 1 WHERE seq = ?', [(row['seq'],) for row in rows])
+
+    def tombstones(self, table: str) -> List[str]:
+        with self._lock:
+            return [row['id'] for row in self._conn.execute('SELECT id FROM tombstones WHERE tbl = ?', (table,))]
+
+    def clear_tombstones(self, table: str, ids: List[str]):
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM tombstones WHERE tbl = ? AND id = ?', [(table, i) for i in ids])
+
+    # Helpers - callers hold self._lock
+
+    def _record(self, table: str, row: sqlite3.Row) -> Dict:
+        record = {header: row[column] for header, column in self.COLUMNS[table]}
+        if table == 'scheduled':
+            # Sheets returns numbers as numbers; keep the same shape
+            duration = str(record['Duration'])
+            record['Duration'] = int(duration) if duration.isdigit() else record['Duration']
+        return record
+
+    def _insert(self, table: str, values: Dict, synced: bool = False):
+        columns = [column for _, column in self.COLUMNS[table]]
+        now = time.time()
+        position = self._conn.execute(f'SELECT COALESCE(MAX(position), 0) + 1 FROM {table}').fetchone()[0]
+        self._conn.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}, position, updated_at, synced_at) "
+            f"VALUES ({', '.join('?' * (len(columns) + 3))})",
+            [str(values.get(column, '') or '') for column in columns] + [position, now, now if synced else None]
+        )
+
+    def _update(self, table: str, record_id: str, **fields) -> bool:
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f'UPDATE {table} SET {assignments}, updated_at = ? WHERE id = ?',
+                list(fields.values()) + [time.time(), record_id]
+            )
+        return cursor.rowcount > 0
+
+    def _next_number(self, table: str) -> int:
+        """Allocate the next ID number inside the caller's transaction"""
+        # Increment first: the write lock is taken before the read, so concurrent processes can't share a number
+        cursor = self._conn.execute('UPDATE counters SET value = value + 1 WHERE name = ?', (table,))
+        if cursor.rowcount == 0:
+            ids = [row[0] for row in self._conn.execute(f'SELECT id FROM {table}')]
+            self._conn.execute('INSERT INTO counters (name, value) VALUES (?, ?)', (table, max([len(ids)] + _id_numbers(ids)) + 1))
+        return self._conn.execute('SELECT value FROM counters WHERE name = ?', (table,)).fetchone()[0]
+
+    def _bump_counter(self, table: str, record_id: str):
+        """Rows arriving from the sheet raise the counter past their ID"""
+        numbers = _id_numbers([record_id])
+        if numbers:
+            self._conn.execute(
+                'UPDATE counters SET value = MAX(value, ?) WHERE name = ?', (numbers[0], table)
+            )
+
+
+class SheetsMirror:
+    """
+    Two-way sync between SQLiteStorage and the spreadsheet, matched by ID.
+
+    Each pass pulls sheet edits into rows without local changes, then pushes local
+    changes as coalesced cell updates and appends, and finally deletes rows removed
+    locally. Rows deleted by hand in the sheet are not deleted locally.
+
+    The web app, scheduler and CLI share one database, so only the process holding
+    the lock file next to it syncs; the others keep trying, and take over when the
+    owner exits.
+    """
+
+    def __init__(self, local: SQLiteStorage, remote: SheetsStorage, interval_seconds: Optional[float] = None):
+        self.local = local
+        self.remote = remote
+        self.interval = interval_seconds or float(os.getenv('STORAGE_SYNC_INTERVAL', '60'))
+        # Own queue, flushed only by sync_once: a failed pass is dropped and recomputed from
+        # the database next time rather than retried, which would append rows twice
+        self.writer = SheetWriter(manual=True)
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owner_path = f"{local.path}.mirror.lock"
+        self._owner_file = None
+
+    def start(self):
+        """Sync once now, so this process starts from current sheet edits, then in the background"""
+        try:
+            self.sync_once()
+        except Exception as e:
+            logger.warning(f"Initial Sheets mirror sync failed: {e}")
+        self._thread = threading.Thread(target=self._loop, name='sheets-mirror', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._sync_lock:
+            if self._owner_file is not None:
+                self._owner_file.close()  # Closing drops the flock
+                self._owner_file = None
+
+    def _own(self) -> bool:
+        """Whether this process is the one mirroring this database"""
+        if self._owner_file is not None:
+            return True
+        owner_file = open(self._owner_path, 'a')
+        if fcntl:
+            try:
+                fcntl.flock(owner_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                owner_file.close()
+                return False
+        self._owner_file = owner_file
+        logger.info(f"This process now mirrors {self.local.path} to Google Sheets")
+        return True
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync_once()
+            except Exception as e:
+                logger.error(f"Sheets mirror sync failed, will retry: {e}")
+
+    def sync_once(self) -> bool:
+        """One sync pass; False when another process owns the mirror"""
+        with self._sync_lock:
+            if self._stop.is_set() or not self._own():
+                return False
+            try:
+                # Topics and Scheduled rows are matched by ID, so re-pushing after a partial failure is harmless
+                scheduled_sheet = self.remote.scheduled_sheet(create=True)
+                topics = self._sync_table('topics', self.remote.topics_sheet)
+                scheduled = self._sync_table('scheduled', scheduled_sheet)
+                self.writer.flush(requeue=False)
+                self.local.mark_synced('topics', topics)
+                self.local.mark_synced('scheduled', scheduled)
+
+                # Published is append-only with no key to match on - flushed and marked on its own
+                published = self.local.unsynced_published()
+                for row in published:
+                    self.writer.append_row(self.remote.videos_sheet, [row[column] for column in PUBLISHED_COLUMNS])
+                self.writer.flush(requeue=False)
+                self.local.mark_published_synced(published)
+            except Exception:
+                self.writer.discard()
+                raise
+            self._push_deletes('scheduled', scheduled_sheet)
+            return True
+
+    def _sync_table(self, table: str, sheet) -> List[sqlite3.Row]:
+        """Pull sheet edits, queue local changes; returns the rows queued"""
+        columns = SQLiteStorage.COLUMNS[table]
+        values = get_sheet_cache().values(sheet, max_age=0)
+        sheet_rows: Dict[str, Tuple[int, List[str]]] = {}
+        records = []
+        for row_number, row in enumerate(values[1:], start=2):
+            row = list(row) + [''] * (len(columns) - len(row))
+            if row[0]:
+                sheet_rows[row[0]] = (row_number, row)
+                records.append({column: row[i] for i, (_, column) in enumerate(columns)})
+
+        pulled = self.local.merge_remote(table, records)
+        if pulled:
+            logger.info(f"Pulled {pulled} {table} rows from Google Sheets")
+
+        dirty = self.local.dirty_rows(table)
+        writer = self.writer
+        for local in dirty:
+            local_values = [str(local[column]) for _, column in columns]
+            if local['id'] in sheet_rows:
+                row_number, sheet_values = sheet_rows[local['id']]
+                for col, (value, current) in enumerate(zip(local_values, sheet_values), start=1):
+                    if value != current:
+                        writer.update_cell(sheet, row_number, col, value)
+            else:
+                writer.append_row(sheet, local_values)
+        return dirty
+
+    def _push_deletes(self, table: str, sheet):
+        ids = self.local.tombstones(table)
+        if not ids:
+            return
+        wanted = set(ids)
+        values = get_sheet_cache().values(sheet, max_age=0)
+        rows = [row_number for row_number, row in enumerate(values[1:], start=2) if row and row[0] in wanted]
+        if rows:
+            self.writer.delete_rows(sheet, rows)
+        self.local.clear_tombstones(table, ids)
+
+
+def create_storage(spreadsheet=None, topics_sheet=None, videos_sheet=None) -> Storage:
+    """
+    Storage for STORAGE_BACKEND. SQLite mirrors to the spreadsheet when one is
+    connected and STORAGE_SHEETS_MIRROR is on; Sheets requires the spreadsheet.
+    """
+    backend = storage_backend()
+    if backend == 'sqlite':
+        storage = SQLiteStorage()
+        if spreadsheet is not None and sheets_mirror_enabled():
+            storage.mirror = SheetsMirror(storage, SheetsStorage(spreadsheet, topics_sheet, videos_sheet))
+            storage.mirror.start()
+        logger.info(f"Using SQLite storage at {storage.path}" + (' with Google Sheets mirror' if storage.mirror else ''))
+        return storage
+    if backend != 'sheets':
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    if spreadsheet is None:
+        raise RuntimeError("Google Sheets storage needs a connected spreadsheet")
+    return SheetsStorage(spreadsheet, topics_sheet, videos_sheet)
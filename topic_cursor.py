@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Topics Cursor
+Persisted high-water marks for the Topics sheet: where the first unpublished topic
+may be, and the next free topic ID. Picking a topic or adding one reads only the
+rows past those marks, so the cost stays flat as the sheet grows
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from loguru import logger
+from integrations import load_gspread
+from sheet_cache import get_sheet_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows - only threads in one process are serialized
+    fcntl = None
+
+# Topics layout: ID | Status | Topic, header on row 1
+FIRST_DATA_ROW = 2
+
+
+class TopicCursor:
+    """Incremental next-topic lookup and ID allocation for one Topics worksheet"""
+
+    def __init__(self, worksheet, state_path: Optional[str] = None, chunk_rows: Optional[int] = None):
+        self.worksheet = worksheet
+        self.state_path = state_path or os.getenv('TOPIC_CURSOR_PATH', 'cache/topic_cursor.json')
+        # Rows read per request while skipping published topics
+        self.chunk_rows = chunk_rows or int(os.getenv('TOPIC_CURSOR_CHUNK_ROWS', '50'))
+        self._key = f"{worksheet.spreadsheet_id}:{worksheet.id}"
+        self._lock = threading.Lock()
+
+    def next_topic(self) -> Optional[Dict]:
+        """First topic that is not Published - same result as scanning every record"""
+        with self._locked() as state:
+            cursor = max(FIRST_DATA_ROW, state.get('cursor', FIRST_DATA_ROW))
+            # Every row above the cursor was Published. Re-read the last of them: if rows were
+            # deleted or a status was reset, it no longer is and the cursor is rebuilt from the top
+            verify = cursor > FIRST_DATA_ROW
+            start = cursor - 1 if verify else cursor
+
+            while True:
+                requested = self.chunk_rows
+                values = self.worksheet.get(f"A{start}:C{start + requested - 1}")
+                if verify:
+                    verify = False
+                    if not values or self._status(values[0]) != 'Published':
+                        logger.info("Topics cursor is stale, rescanning from the first row")
+                        start = FIRST_DATA_ROW
+                        continue
+                    values, start, requested = values[1:], start + 1, requested - 1
+
+                for offset, row in enumerate(values):
+                    if self._status(row) != 'Published':
+                        state['cursor'] = start + offset
+                        return self._topic(start + offset, row)
+
+                if len(values) < requested:
+                    # Past the last row - nothing pending
+                    state['cursor'] = start + len(values)
+                    return None
+                start += len(values)
+
+    def add_topic(self, topic: str) -> str:
+        """Append a topic with the next free ID and return that ID"""
+        with self._locked() as state:
+            rows, next_id = state.get('rows'), state.get('next_id')
+            if rows is None or next_id is None:
+                # First use: one read of the ID column seeds both marks
+                ids = self.worksheet.col_values(1)[1:]
+                rows, next_id = len(ids) + 1, len(ids) + 1
+            else:
+                # Only rows added since our last append - by another host or by hand
+                ids = [row[0] for row in self.worksheet.get(f"A{rows + 1}:A") if row]
+                rows += len(ids)
+            next_id = max([next_id] + [number + 1 for number in self._numbers(ids)])
+
+            topic_id = f"{next_id:03d}"
+            self.worksheet.append_row([topic_id, '', topic])
+            get_sheet_cache().invalidate(self.worksheet)
+            state['rows'], state['next_id'] = rows + 1, next_id + 1
+            return topic_id
+
+    @staticmethod
+    def _status(row: List[str]) -> str:
+        return row[1] if len(row) > 1 else ''
+
+    @staticmethod
+    def _topic(row_number: int, row: List[str]) -> Dict:
+        # Numericised like get_all_records, so IDs come back as they always have
+        topic_id, _, topic = load_gspread().utils.numericise_all((row + ['', '', ''])[:3])
+        return {'row': row_number, 'topic': topic, 'id': topic_id}
+
+    @staticmethod
+    def _numbers(ids: List[str]) -> List[int]:
+        return [int(value) for value in map(str, ids) if value.strip().isdigit()]
+
+    def _locked(self):
+        return _StateLock(self)
+
+
+class _StateLock:
+    """Holds the cursor's locks and yields its persisted state, saving it on clean exit"""
+
+    def __init__(self, cursor: TopicCursor):
+        self.cursor = cursor
+        self.state: Dict = {}
+        self._all: Dict = {}
+        self._file = None
+
+    def __enter__(self) -> Dict:
+        self.cursor._lock.acquire()
+        try:
+            os.makedirs(os.path.dirname(self.cursor.state_path) or '.', exist_ok=True)
+            # Gunicorn workers and the scheduler share the file - serialize allocate-and-append across them
+            self._file = open(f"{self.cursor.state_path}.lock", 'a')
+            if fcntl:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                with open(self.cursor.state_path) as f:
+                    self._all = json.load(f)
+            except (OSError, ValueError):
+                self._all = {}
+            self.state = self._all.setdefault(self.cursor._key, {})
+            return self.state
+        except Exception:
+            self._release()
+            raise
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                tmp_path = f"{self.cursor.state_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._all, f)
+                os.replace(tmp_path, self.cursor.state_path)
+        finally:
+            self._release()
+        return False
+
+    def _release(self):
+        if self._file is not None:
+            if fcntl:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.cursor._lock.release()
+
+
+_cursors: Dict[str, TopicCursor] = {}
+_cursors_lock = threading.Lock()
+
+
+def get_topic_cursor(worksheet) -> TopicCursor:
+    """Get the process-wide cursor for a Topics worksheet"""
+    key = f"{worksheet.spreadsheet_id}:{worksheet.id}"
+    with _cursors_lock:
+        cursor = _cursors.get(key)
+        if cursor is None:
+            cursor = _cursors[key] = TopicCursor(worksheet)
+    return cursor
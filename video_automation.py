@@ -6,23 +6,35 @@ Generates 2-3 videos daily using Grok API and Google Veo 3
 
 import os
 import json
+import threading
 import time
 from datetime import datetime
-from typing import Dict, List, Optional
-import gspread
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-import requests
+from typing import Dict, Iterator, List, Optional
+from integrations import (
+    load_auth_request, load_discovery_build, load_gspread, load_installed_app_flow,
+    load_media_file_upload, load_oauth_credentials, load_service_account_credentials
+)
+from grok_client import get_grok_client
 from secure_logger import setup_secure_logger
 logger = setup_secure_logger()
 from dotenv import load_dotenv
-import fal_client
 import subprocess
 import tempfile
 from prompt_optimizer import PromptOptimizer
+from script_pipeline import ScriptPipeline
+from render_engine import get_render_engine
+from render_cache import get_render_cache
+from segment_manifest import SegmentManifest
+from image_preparation import PreparedImage, get_image_preparer
+from image_hosting import get_image_host
+from disk_cache import DiskCache
+from sheet_cache import DRIVE_METADATA_SCOPE, get_sheet_cache
+from storage import Storage, create_storage, sheets_mirror_enabled, storage_backend
+from script_stream import JSONFieldParser, iter_sse_content
+from script_schema import (
+    SCRIPT_SCHEMA, invalid_fields, merge_fields, multi_segment_script_schema,
+    parse_script_json, repair_script, response_format, subset_schema
+)
 
 # Load environment variables
 load_dotenv()
@@ -30,47 +42,46 @@ load_dotenv()
 # Configure logging
 logger.add("logs/video_automation_{time}.log", rotation="1 day", retention="7 days")
 
+# Bump when the image analysis prompt or model changes so cached descriptions are not reused
+IMAGE_ANALYSIS_MODEL = 'grok-2-vision-1212'
+IMAGE_ANALYSIS_PROMPT_VERSION = 1
+
+# Bump when the script generation prompts or post-processing change so cached scripts are not reused
+SCRIPT_PROMPT_VERSION = 6
+
 class VideoAutomation:
     def _analyze_images_with_grok2(self, image_paths: List[str]) -> str:
-        """Analyze images using Grok 2 Vision model"""
+        """Analyze images using Grok 2 Vision model, reusing cached descriptions for the same images"""
+        # Same image set + prompt version -> same description, skip the vision round trip
+        try:
+            image_hashes = [get_image_preparer().content_hash(path) for path in image_paths]
+            cache_key = self.vision_cache.make_key(IMAGE_ANALYSIS_MODEL, IMAGE_ANALYSIS_PROMPT_VERSION, image_hashes)
+        except OSError as e:
+            logger.error(f"Failed to read images for analysis: {e}")
+            cache_key = None
+        
+        if cache_key:
+            cached = self.vision_cache.get(cache_key)
+            if cached:
+                logger.info("Using cached Grok 2 Vision image analysis")
+                return cached
+        
         logger.info("Analyzing images with Grok 2 Vision")
         
-        headers = {
-            'Authorization': f'Bearer {self.grok_api_key}',
-            'Content-Type': 'application/json'
-        }
+        headers = self._grok_headers()
         
-        # Prepare images for Grok 2 Vision
+        # Prepare images for Grok 2 Vision - normalized payloads are shared with video generation
         image_content = []
-        import base64
-        from PIL import Image
-        import io
         
         for i, img_path in enumerate(image_paths):
             try:
-                with Image.open(img_path) as img:
-                    logger.info(f"Processing image for Grok 2: {img.size}, format: {img.format}")
-                    
-                    if img.mode not in ('RGB', 'L'):
-                        img = img.convert('RGB')
-                    
-                    # Resize if needed
-                    max_size = 2048
-                    if max(img.size) > max_size:
-                        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-                    
-                    buffer = io.BytesIO()
-                    img.save(buffer, format='JPEG', quality=85, optimize=True)
-                    buffer.seek(0)
-                    
-                    image_data = base64.b64encode(buffer.read()).decode('utf-8')
-                    
-                    image_content.append({
-                        'type': 'image_url',
-                        'image_url': {
-                            'url': f"data:image/jpeg;base64,{image_data}"
-                        }
-                    })
+                prepared = get_image_preparer().prepare_one(img_path)
+                image_content.append({
+                    'type': 'image_url',
+                    'image_url': {
+                        'url': prepared.data_uri
+                    }
+                })
                 logger.info(f"Successfully prepared image {i+1} for Grok 2")
             except Exception as e:
                 logger.error(f"Failed to prepare image for Grok 2: {e}")
@@ -93,13 +104,13 @@ Be specific and detailed in your description."""
         ] + image_content
         
         data = {
-            'model': 'grok-2-vision-1212',  # Using Grok 2 Vision model
+            'model': IMAGE_ANALYSIS_MODEL,  # Using Grok 2 Vision model
             'messages': [{'role': 'user', 'content': message_content}],
             'temperature': 0.7
         }
         
         try:
-            response = requests.post(self.grok_api_url, headers=headers, json=data)
+            response = get_grok_client().post(self.grok_api_url, headers=headers, json=data)
             
             if response.status_code != 200:
                 logger.error(f"Grok 2 Vision API failed - Status: {response.status_code}")
@@ -109,6 +120,8 @@ Be specific and detailed in your description."""
             response.raise_for_status()
             content = response.json()['choices'][0]['message']['content']
             logger.info("Image analysis successful")
+            if cache_key and content:
+                self.vision_cache.set(cache_key, content)
             return content
             
         except Exception as e:
@@ -116,16 +129,15 @@ Be specific and detailed in your description."""
             return ""
     
     def __init__(self, skip_external_setup=False):
+        # The googleapiclient/httplib2 YouTube client is not thread-safe - uploads take turns
+        self._youtube_lock = threading.Lock()
         # Allow skipping external service setup for web UI usage
         if not skip_external_setup:
             try:
-                self.setup_google_sheets()
+                self.setup_storage()
             except Exception as e:
-                logger.warning(f"Google Sheets setup failed: {e}")
-                self.gc = None
-                self.spreadsheet = None
-                self.topics_sheet = None
-                self.videos_sheet = None
+                logger.warning(f"Storage setup failed: {e}")
+                self.storage = None
             
             try:
                 self.setup_youtube()
@@ -134,6 +146,8 @@ Be specific and detailed in your description."""
                 self.youtube = None
         else:
             # Initialize as None when skipping setup
+            self.storage = None
+            self.sheets_credentials = None
             self.gc = None
             self.spreadsheet = None
             self.topics_sheet = None
@@ -143,15 +157,49 @@ Be specific and detailed in your description."""
         self.grok_api_key = os.getenv('GROK_API_KEY')
         self.grok_api_url = os.getenv('GROK_API_URL', 'https://api.x.ai/v1/chat/completions')
         self.fal_api_key = os.getenv('FAL_API_KEY')
+        self.veo_endpoint = 'fal-ai/veo3'
+        self.max_concurrent_segments = int(os.getenv('VEO_MAX_CONCURRENT_SEGMENTS', '4'))
+        self.upload_reference_images = os.getenv('FAL_UPLOAD_REFERENCE_IMAGES', 'false').lower() == 'true'
+        # Ask Grok for schema-conforming JSON, and re-request only broken fields when a reply falls short
+        self.structured_output = os.getenv('GROK_STRUCTURED_OUTPUT', 'true').lower() == 'true'
+        self.script_repair_attempts = int(os.getenv('SCRIPT_REPAIR_ATTEMPTS', '1'))
         self.prompt_optimizer = PromptOptimizer()
+        self.script_pipeline = ScriptPipeline(self.prompt_optimizer)
+        self.vision_cache = DiskCache(
+            os.getenv('VISION_CACHE_DIR', 'cache/vision'),
+            ttl_seconds=int(os.getenv('VISION_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+            max_entries=int(os.getenv('VISION_CACHE_MAX_ENTRIES', '500'))
+        )
         
+    def setup_storage(self):
+        """Open the STORAGE_BACKEND store - Google Sheets, or SQLite with an optional Sheets mirror"""
+        self.sheets_credentials = None
+        self.gc = None
+        self.spreadsheet = None
+        self.topics_sheet = None
+        self.videos_sheet = None
+        if storage_backend() == 'sheets' or sheets_mirror_enabled():
+            try:
+                self.setup_google_sheets()
+            except Exception as e:
+                if storage_backend() == 'sheets':
+                    raise
+                logger.warning(f"Google Sheets unavailable, SQLite runs without its mirror: {e}")
+        self.storage: Storage = create_storage(self.spreadsheet, self.topics_sheet, self.videos_sheet)
+
     def setup_google_sheets(self):
         """Initialize Google Sheets connection"""
-        creds = Credentials.from_service_account_file(
+        scopes = ['https://www.googleapis.com/auth/spreadsheets']
+        if get_sheet_cache().revision_check:
+            # Drive modifiedTime tells the snapshot cache whether a sheet changed
+            scopes.append(DRIVE_METADATA_SCOPE)
+        # Sheets libraries load here, not at import - most web requests never need them
+        creds = load_service_account_credentials().from_service_account_file(
             os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH'),
-            scopes=['https://www.googleapis.com/auth/spreadsheets']
+            scopes=scopes
         )
-        self.gc = gspread.authorize(creds)
+        self.sheets_credentials = creds
+        self.gc = load_gspread().authorize(creds)
         self.spreadsheet = self.gc.open_by_key(os.getenv('SPREADSHEET_ID'))
         self.topics_sheet = self.spreadsheet.worksheet('Topics')
         self.videos_sheet = self.spreadsheet.worksheet('Published')
@@ -166,14 +214,13 @@ Be specific and detailed in your description."""
             with open(token_path, 'r') as token:
                 creds_data = json.load(token)
                 # Create credentials from saved token
-                from google.oauth2.credentials import Credentials as OAuthCredentials
-                creds = OAuthCredentials.from_authorized_user_info(creds_data, SCOPES)
+                creds = load_oauth_credentials().from_authorized_user_info(creds_data, SCOPES)
         
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
+                creds.refresh(load_auth_request()())
             else:
-                flow = InstalledAppFlow.from_client_secrets_file(
+                flow = load_installed_app_flow().from_client_secrets_file(
                     os.getenv('YOUTUBE_CLIENT_SECRETS_PATH'), SCOPES)
                 creds = flow.run_local_server(port=0)
             
@@ -181,27 +228,56 @@ Be specific and detailed in your description."""
             with open(token_path, 'w') as token:
                 token.write(creds.to_json())
         
-        self.youtube = build('youtube', 'v3', credentials=creds)
+        self.youtube = load_discovery_build()('youtube', 'v3', credentials=creds)
         
     def get_next_topic(self) -> Optional[Dict]:
         """Get next unprocessed topic from Google Sheets"""
-        all_records = self.topics_sheet.get_all_records()
-        for idx, record in enumerate(all_records, start=2):  # Start at 2 (header is row 1)
-            if record.get('Status') != 'Published':
-                return {'row': idx, 'topic': record.get('Topic'), 'id': record.get('ID')}
-        return None
+        # Sheets reads only the rows past the persisted cursor; SQLite uses its pending-topics index
+        return self.storage.next_topic()
         
+    def _grok_headers(self) -> Dict:
+        return {
+            'Authorization': f'Bearer {self.grok_api_key}',
+            'Content-Type': 'application/json'
+        }
+    
     def generate_script(self, topic: str, style: str = 'cinematic', image_paths: Optional[List[str]] = None) -> Dict:
         """Generate video script using Grok API with advanced cinematography prompting and image analysis"""
         logger.info(f"Generating script for topic: {topic} in {style} style")
+        headers = self._grok_headers()
+        data = self._script_request(topic, style, image_paths)
+        
+        response = get_grok_client().post_structured(self.grok_api_url, headers=headers, json=data)
+        
+        # Log request details for debugging
+        if response.status_code != 200:
+            logger.error(f"API Request failed - Status: {response.status_code}")
+            logger.error(f"Response: {response.text}")
+            logger.error(f"Request URL: {self.grok_api_url}")
+            logger.error(f"Request Headers: {headers}")
+            # Log request data
+            logger.error(f"Request Data: {json.dumps(data, indent=2)}")
+            
+            # Check for specific error messages
+            try:
+                error_data = response.json()
+                if 'error' in error_data:
+                    logger.error(f"API Error Message: {error_data['error']}")
+            except:
+                pass
+        
+        response.raise_for_status()
+        
+        content = response.json()['choices'][0]['message']['content']
+        logger.info(f"Raw Grok response: {content[:500]}...")  # Log first 500 chars
+        
+        return self._finalize_script(content, topic, style, data)
+    
+    def _script_request(self, topic: str, style: str, image_paths: Optional[List[str]]) -> Dict:
+        """Grok request body for a single-segment script"""
         if image_paths:
             logger.info(f"Analyzing {len(image_paths)} reference images")
         
-        headers = {
-            'Authorization': f'Bearer {self.grok_api_key}',
-            'Content-Type': 'application/json'
-        }
-        
         # Style-specific instructions
         style_instructions = {
             'cinematic': "Use dramatic camera movements, film-like color grading, shallow depth of field, and professional cinematography techniques.",
@@ -260,147 +336,45 @@ Be specific and detailed in your description."""
             'messages': [{'role': 'user', 'content': prompt}],
             'temperature': 0.7
         }
+        if self.structured_output:
+            data['response_format'] = response_format(SCRIPT_SCHEMA, 'video_script')
+        return data
+    
+    def _finalize_script(self, content: str, topic: str, style: str, request_data: Dict) -> Dict:
+        """Parse Grok's single-segment script and fill in optimized prompt fields"""
+        script_data = self._parse_script(content, request_data, SCRIPT_SCHEMA)
+        logger.info(f"Parsed script data keys: {list(script_data.keys())}")
+        
+        script_data = self.script_pipeline.normalize(script_data, topic, style=style)
+        
+        logger.info(f"Generated script data keys: {list(script_data.keys())}")
+        logger.info(f"Final veo3 prompt preview: {script_data['final_veo3_prompt'][:200]}...")
+        return script_data
+    
+    def generate_multi_segment_script(self, topic: str, num_segments: int, style: str = 'cinematic', image_paths: Optional[List[str]] = None) -> Dict:
+        """Generate script for multiple connected video segments with image analysis"""
+        logger.info(f"Generating {num_segments}-segment script for topic: {topic} in {style} style")
+        data = self._multi_segment_script_request(topic, num_segments, style, image_paths)
         
-        response = requests.post(self.grok_api_url, headers=headers, json=data)
+        response = get_grok_client().post_structured(self.grok_api_url, headers=self._grok_headers(), json=data)
         
         # Log request details for debugging
         if response.status_code != 200:
             logger.error(f"API Request failed - Status: {response.status_code}")
             logger.error(f"Response: {response.text}")
-            logger.error(f"Request URL: {self.grok_api_url}")
-            logger.error(f"Request Headers: {headers}")
-            # Log request data
-            logger.error(f"Request Data: {json.dumps(data, indent=2)}")
-            
-            # Check for specific error messages
-            try:
-                error_data = response.json()
-                if 'error' in error_data:
-                    logger.error(f"API Error Message: {error_data['error']}")
-            except:
-                pass
         
         response.raise_for_status()
         
         content = response.json()['choices'][0]['message']['content']
-        logger.info(f"Raw Grok response: {content[:500]}...")  # Log first 500 chars
-        
-        try:
-            script_data = json.loads(content)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from Grok: {e}")
-            logger.error(f"Content: {content}")
-            # Try to extract JSON from content if it's wrapped in markdown
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
-            if json_match:
-                script_data = json.loads(json_match.group(1))
-            else:
-                raise
-        
-        logger.info(f"Parsed script data keys: {list(script_data.keys())}")
-        visual_prompts = script_data.get('visual_prompts', 'NOT FOUND')
-        if visual_prompts != 'NOT FOUND' and isinstance(visual_prompts, str):
-            logger.info(f"visual_prompts content: {visual_prompts[:200]}...")
-        else:
-            logger.info(f"visual_prompts content: {visual_prompts}")
-        
-        # Store original camera_work and lighting if they exist
-        original_camera_work = script_data.get('camera_work')
-        original_lighting = script_data.get('lighting')
-        
-        # Apply prompt optimization only if fields are missing
-        if 'visual_prompts' in script_data:
-            # Convert dict visual prompts to string if needed
-            visual_prompts_text = script_data['visual_prompts']
-            if isinstance(visual_prompts_text, dict):
-                # Store original for reference
-                script_data['_original_visual_prompts'] = visual_prompts_text.copy()
-                
-                # Convert structured dict to narrative string
-                prompt_parts = []
-                for key, value in visual_prompts_text.items():
-                    if isinstance(value, dict):
-                        # Handle nested dicts
-                        for sub_key, sub_value in value.items():
-                            prompt_parts.append(f"{sub_value}")
-                    else:
-                        prompt_parts.append(f"{value}")
-                visual_prompts_text = " ".join(prompt_parts)
-                script_data['visual_prompts'] = visual_prompts_text
-            
-            # Get optimized style data
-            style_data = self.prompt_optimizer.generate_style_prompt(
-                visual_prompts_text,
-                style=style
-            )
-            
-            # Enhance the visual prompts with optimization
-            enhanced_prompt = self.prompt_optimizer.optimize_prompt(
-                visual_prompts_text,
-                style=style
-            )
-            
-            script_data['visual_prompts'] = enhanced_prompt
-            
-            # Restore original camera_work and lighting if they existed
-            if original_camera_work:
-                script_data['camera_work'] = original_camera_work
-            elif 'camera_work' not in script_data:
-                script_data['camera_work'] = style_data['camera_work']
-            
-            if original_lighting:
-                script_data['lighting'] = original_lighting
-            elif 'lighting' not in script_data:
-                script_data['lighting'] = style_data['lighting']
-            
-            if 'technical_specs' not in script_data:
-                script_data['technical_specs'] = style_data['technical_specs']
-            
-            # Ensure we have style keywords
-            if 'style_keywords' not in script_data:
-                script_data['style_keywords'] = style_data['style_keywords']
-        
-        # Build the final prompt that will be sent to Veo 3
-        final_prompt = script_data.get('visual_prompts', '')
-        if 'style_keywords' in script_data and isinstance(script_data['style_keywords'], list):
-            final_prompt = f"{final_prompt}. Style: {', '.join(script_data['style_keywords'])}"
-        
-        # Store the final prompt for preview
-        script_data['final_veo3_prompt'] = final_prompt
-        
-        logger.info(f"Generated script data keys: {list(script_data.keys())}")
-        vp_preview = script_data.get('visual_prompts', '')
-        if vp_preview and isinstance(vp_preview, str):
-            logger.info(f"Visual prompts preview: {vp_preview[:200]}...")
-        else:
-            logger.info(f"Visual prompts preview: {vp_preview}")
-            
-        fvp_preview = script_data.get('final_veo3_prompt', '')
-        if fvp_preview and isinstance(fvp_preview, str):
-            logger.info(f"Final veo3 prompt preview: {fvp_preview[:200]}...")
-        else:
-            logger.info(f"Final veo3 prompt preview: {fvp_preview}")
-        
-        # Ensure we always have at least one prompt field
-        if not script_data.get('visual_prompts') and not script_data.get('final_veo3_prompt'):
-            logger.warning("No visual prompts found in script data!")
-            script_data['visual_prompts'] = f"Create a video about {topic}"
-            script_data['final_veo3_prompt'] = script_data['visual_prompts']
+        logger.info(f"Raw Grok multi-segment response: {content[:500]}...")  # Log first 500 chars
         
-        return script_data
+        return self._finalize_multi_segment_script(content, topic, num_segments, style, data)
     
-    def generate_multi_segment_script(self, topic: str, num_segments: int, style: str = 'cinematic', image_paths: Optional[List[str]] = None) -> Dict:
-        """Generate script for multiple connected video segments with image analysis"""
-        logger.info(f"Generating {num_segments}-segment script for topic: {topic} in {style} style")
+    def _multi_segment_script_request(self, topic: str, num_segments: int, style: str, image_paths: Optional[List[str]]) -> Dict:
+        """Grok request body for a multi-segment script"""
         if image_paths:
             logger.info(f"Analyzing {len(image_paths)} reference images")
         
-        headers = {
-            'Authorization': f'Bearer {self.grok_api_key}',
-            'Content-Type': 'application/json'
-        }
-        
         # Style-specific instructions (same as single segment)
         style_instructions = {
             'cinematic': "Use dramatic camera movements, film-like color grading, shallow depth of field, and professional cinematography techniques.",
@@ -454,84 +428,144 @@ Be specific and detailed in your description."""
             'messages': [{'role': 'user', 'content': prompt}],
             'temperature': 0.7
         }
+        if self.structured_output:
+            data['response_format'] = response_format(multi_segment_script_schema(num_segments), 'multi_segment_video_script')
+        return data
+    
+    def _finalize_multi_segment_script(self, content: str, topic: str, num_segments: int, style: str, request_data: Dict) -> Dict:
+        """Parse Grok's multi-segment script and build the combined preview prompt"""
+        script_data = self._parse_script(content, request_data, multi_segment_script_schema(num_segments))
+        logger.info(f"Multi-segment parsed keys: {list(script_data.keys())}")
         
-        response = requests.post(self.grok_api_url, headers=headers, json=data)
+        script_data = self.script_pipeline.normalize(script_data, topic, style=style, num_segments=num_segments)
         
-        # Log request details for debugging
+        logger.info(f"Multi-segment script data keys: {list(script_data.keys())}")
+        return script_data
+    
+    def _parse_script(self, content: str, request_data: Dict, schema: Dict) -> Dict:
+        """Parse and validate a script, re-requesting only the fields that are missing or malformed"""
+        script_data = repair_script(parse_script_json(content))
+        
+        for attempt in range(self.script_repair_attempts):
+            missing = invalid_fields(script_data, schema)
+            if not missing:
+                break
+            logger.warning(f"Script is missing or has invalid fields {missing}, re-requesting just those")
+            patch = self._request_script_fields(request_data, script_data, missing, schema)
+            merge_fields(script_data, repair_script(patch), missing)
+        
+        missing = invalid_fields(script_data, schema)
+        if missing:
+            logger.warning(f"Continuing with incomplete script, still missing: {missing}")
+        if not script_data:
+            logger.error(f"Content: {content}")
+            raise ValueError("Grok returned no usable script JSON")
+        return script_data
+    
+    def _request_script_fields(self, request_data: Dict, script_data: Dict, fields: List[str], schema: Dict) -> Dict:
+        """Ask Grok for just the given fields, in the context of the original prompt and the fields it already wrote"""
+        kept = {k: v for k, v in script_data.items() if k not in fields and not k.startswith('_')}
+        data = {
+            'model': request_data['model'],
+            'messages': request_data['messages'] + [
+                {'role': 'assistant', 'content': json.dumps(kept)},
+                {'role': 'user', 'content': (
+                    f"The JSON above is missing or has invalid values for: {', '.join(fields)}. "
+                    "Following the original instructions, reply with a JSON object containing only these fields."
+                )}
+            ],
+            'temperature': request_data.get('temperature', 0.7)
+        }
+        if self.structured_output:
+            data['response_format'] = response_format(subset_schema(schema, fields), 'video_script_fields')
+        
+        try:
+            response = get_grok_client().post_structured(self.grok_api_url, headers=self._grok_headers(), json=data)
+            if response.status_code != 200:
+                logger.error(f"Field re-request failed - Status: {response.status_code}")
+                logger.error(f"Response: {response.text}")
+                return {}
+            return parse_script_json(response.json()['choices'][0]['message']['content'])
+        except Exception as e:
+            logger.error(f"Failed to re-request script fields: {e}")
+            return {}
+
+    def stream_script(self, topic: str, num_segments: int = 1, style: str = 'cinematic', image_paths: Optional[List[str]] = None) -> Iterator[Dict]:
+        """
+        Generate a script with Grok's streaming API, yielding fields as they arrive.
+
+        Yields {'event': 'field', 'field', 'value'} for each top-level field,
+        {'event': 'segment', 'index', 'value'} for each completed segment, and finally
+        {'event': 'script', 'script_data'} with the same post-processed result as
+        generate_script / generate_multi_segment_script.
+        """
+        logger.info(f"Streaming {num_segments}-segment script for topic: {topic} in {style} style")
+        if num_segments == 1:
+            data = self._script_request(topic, style, image_paths)
+        else:
+            data = self._multi_segment_script_request(topic, num_segments, style, image_paths)
+        data['stream'] = True
+
+        response = get_grok_client().post_structured(self.grok_api_url, headers=self._grok_headers(), json=data, stream=True)
         if response.status_code != 200:
             logger.error(f"API Request failed - Status: {response.status_code}")
             logger.error(f"Response: {response.text}")
-        
         response.raise_for_status()
-        
-        content = response.json()['choices'][0]['message']['content']
-        logger.info(f"Raw Grok multi-segment response: {content[:500]}...")  # Log first 500 chars
-        
+
+        parser = JSONFieldParser()
         try:
-            script_data = json.loads(content)
-            logger.info(f"Multi-segment parsed keys: {list(script_data.keys())}")
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from Grok: {e}")
-            logger.error(f"Content: {content}")
-            # Try to extract JSON from content if it's wrapped in markdown
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
-            if json_match:
-                script_data = json.loads(json_match.group(1))
-            else:
-                raise
-        
-        # For multi-segment, we need to combine all visual prompts
-        if 'segments' in script_data:
-            all_prompts = []
-            for segment in script_data['segments']:
-                if 'visual_prompts' in segment:
-                    all_prompts.append(segment['visual_prompts'])
-            
-            # Combine into a single visual prompt for the preview
-            script_data['visual_prompts'] = ' '.join(all_prompts)
-            
-            # Apply style-specific optimization
-            style_data = self.prompt_optimizer.generate_style_prompt(
-                script_data.get('visual_prompts', topic),
-                style=style
-            )
-            
-            # Build final prompt
-            final_prompt = script_data.get('visual_prompts', '')
-            if 'style_keywords' in script_data and isinstance(script_data['style_keywords'], list):
-                final_prompt = f"{final_prompt}. Style: {', '.join(script_data['style_keywords'])}"
-            
-            script_data['final_veo3_prompt'] = final_prompt
-        
-        logger.info(f"Multi-segment script data keys: {list(script_data.keys())}")
-        
-        # For multi-segment, create a combined visual_prompts for preview
-        if 'segments' in script_data and script_data['segments']:
-            combined_prompts = []
-            for i, segment in enumerate(script_data['segments']):
-                if 'visual_prompts' in segment:
-                    combined_prompts.append(f"SEGMENT {i+1} (8 seconds):\n{segment['visual_prompts']}")
-            
-            # Store combined prompts for preview
-            script_data['visual_prompts'] = "\n\n".join(combined_prompts) if combined_prompts else f"Create a {num_segments * 8}-second video about {topic}"
-            
-            # Build final prompt with style keywords
-            final_prompt = script_data['visual_prompts']
-            if 'style_keywords' in script_data and isinstance(script_data['style_keywords'], list):
-                final_prompt = f"{final_prompt}\n\nStyle: {', '.join(script_data['style_keywords'])}"
-            script_data['final_veo3_prompt'] = final_prompt
-            
-            logger.info(f"Combined {len(combined_prompts)} segment prompts for preview")
-        
-        return script_data
-        
-    def generate_video(self, script_data: Dict, image_paths: Optional[List[str]] = None) -> str:
-        """Generate video using Google Veo 3 via FAL API with support for multiple reference images"""
-        logger.info("Generating video with Veo 3")
+            for delta in iter_sse_content(response.iter_lines()):
+                for event in parser.feed(delta):
+                    if event[0] == 'field':
+                        yield {'event': 'field', 'field': event[1], 'value': event[2]}
+                    elif event[1] == 'segments':
+                        yield {'event': 'segment', 'index': event[2], 'value': event[3]}
+        finally:
+            response.close()
+
+        content = parser.buffer
+        logger.info(f"Raw Grok streamed response: {content[:500]}...")  # Log first 500 chars
+        if num_segments == 1:
+            script_data = self._finalize_script(content, topic, style, data)
+        else:
+            script_data = self._finalize_multi_segment_script(content, topic, num_segments, style, data)
+        yield {'event': 'script', 'script_data': script_data}
+
+    def prepare_reference_images(self, image_paths: Optional[List[str]]) -> List[PreparedImage]:
+        """Normalize reference images once per job; payloads are cached by content hash"""
+        if not image_paths:
+            return []
+        if isinstance(image_paths, str):
+            # Single image path (backward compatibility)
+            image_paths = [image_paths]
+        return get_image_preparer().prepare(image_paths)
+    
+    def _reference_urls(self, images: Optional[List[PreparedImage]]) -> List[str]:
+        """What Veo gets for each reference image - hosted URLs keep request bodies tiny; inline data URIs need no upload"""
+        if not images:
+            return []
+        if self.upload_reference_images:
+            return [get_image_host().url_for(image) for image in images]
+        return [image.data_uri for image in images]
+    
+    def _render_key(self, arguments: Dict, images: Optional[List[PreparedImage]], image_urls: List[str]) -> str:
+        """
+        Render cache and segment manifest key for a request. Hosted URLs change on
+        every re-upload, so images are keyed by their content hash instead
+        """
+        by_url = {url: f"sha256:{image.content_hash}" for image, url in zip(images or [], image_urls)}
         
-        # FAL client will use FAL_KEY from environment
+        def keyed(value):
+            if isinstance(value, dict):
+                return {k: keyed(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [keyed(v) for v in value]
+            return by_url.get(value, value) if isinstance(value, str) else value
         
+        return get_render_cache().make_key(self.veo_endpoint, keyed(arguments))
+    
+    def _build_video_arguments(self, script_data: Dict, images: Optional[List[PreparedImage]] = None, image_urls: Optional[List[str]] = None) -> Dict:
+        """Build the Veo 3 request arguments for a script, with support for multiple reference images"""
         # Combine visual prompts into video generation prompt
         if isinstance(script_data.get('visual_prompts'), list):
             video_prompt = f"{script_data['title']}. " + " ".join(script_data['visual_prompts'])
@@ -543,11 +577,8 @@ Be specific and detailed in your description."""
         if 'style_keywords' in script_data:
             video_prompt = f"{video_prompt}. Style: {', '.join(script_data['style_keywords'])}"
         
-        # Generate video using Google Veo 3
-        def on_queue_update(update):
-            if isinstance(update, fal_client.InProgress):
-                for log in update.logs:
-                    logger.info(f"Veo3 Progress: {log['message']}")
+        # Fold repeated directives and keep the prompt within VEO_MAX_PROMPT_CHARS
+        video_prompt = self.prompt_optimizer.compact_prompt(video_prompt)
         
         # Build arguments
         arguments = {
@@ -557,76 +588,64 @@ Be specific and detailed in your description."""
         }
         
         # Handle multiple reference images
-        if image_paths:
-            import base64
-            
-            if isinstance(image_paths, str):
-                # Single image path (backward compatibility)
-                image_paths = [image_paths]
+        if images:
+            if image_urls is None:
+                image_urls = self._reference_urls(images)
             
-            if len(image_paths) == 1:
+            if len(images) == 1:
                 # Single image - use as before
-                with open(image_paths[0], 'rb') as img_file:
-                    image_data = base64.b64encode(img_file.read()).decode('utf-8')
-                    arguments["image_url"] = f"data:image/jpeg;base64,{image_data}"
-                    logger.info(f"Using single image guidance from: {image_paths[0]}")
+                arguments["image_url"] = image_urls[0]
+                logger.info(f"Using single image guidance: {images[0].content_hash[:12]}")
             else:
                 # Multiple images - create array of image URLs
-                image_urls = []
-                for i, img_path in enumerate(image_paths):
-                    with open(img_path, 'rb') as img_file:
-                        image_data = base64.b64encode(img_file.read()).decode('utf-8')
-                        image_urls.append(f"data:image/jpeg;base64,{image_data}")
-                    logger.info(f"Added reference image {i+1}: {img_path}")
+                logger.info(f"Added {len(image_urls)} reference images")
                 
                 # Try sending as array (Veo 3 might support this)
                 arguments["image_urls"] = image_urls
                 
                 # Also add specific frame references if we have 2 images
-                if len(image_paths) == 2:
+                if len(images) == 2:
                     arguments["first_frame_image"] = image_urls[0]
                     arguments["last_frame_image"] = image_urls[1]
                     logger.info("Using first and last frame specification")
         
-        # Standard horizontal video format
-        
-        result = fal_client.subscribe(
-            "fal-ai/veo3",
-            arguments=arguments,
-            with_logs=True,
-            on_queue_update=on_queue_update
-        )
-        
-        # Log the result to see structure
-        logger.info(f"Veo3 result: {result}")
-        
-        # Download video - check for different possible keys
-        video_url = result.get('video', {}).get('url') or result.get('url') or result.get('video_url')
+        return arguments
+    
+    def generate_video(self, script_data: Dict, image_paths: Optional[List[str]] = None, output_path: Optional[str] = None) -> str:
+        """Generate video using Google Veo 3 via FAL API with support for multiple reference images"""
+        logger.info("Generating video with Veo 3")
         
-        if not video_url:
-            logger.error(f"No video URL found in Veo3 result. Result structure: {result}")
-            raise ValueError("Failed to generate video: No video URL returned from Veo3 API")
+        # FAL client will use FAL_KEY from environment
+        images = self.prepare_reference_images(image_paths)
+        image_urls = self._reference_urls(images)
+        arguments = self._build_video_arguments(script_data, images, image_urls)
         
-        video_path = f"output/video_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
+        video_path = output_path or f"output/video_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
         
-        response = requests.get(video_url)
-        with open(video_path, 'wb') as f:
-            f.write(response.content)
-            
-        logger.info(f"Video saved to: {video_path}")
-        return video_path
+        # The render engine submits, polls and downloads on its shared event loop
+        return get_render_engine().render_sync(
+            self.veo_endpoint, arguments, video_path, label='Veo3',
+            cache_key=self._render_key(arguments, images, image_urls)
+        )
     
-    def generate_multi_segment_video(self, script_data: Dict, image_paths: Optional[List[str]], job_status: Dict) -> str:
-        """Generate multiple video segments and concatenate them"""
+    def generate_multi_segment_video(self, script_data: Dict, image_paths: Optional[List[str]], job_status: Dict, max_concurrent: Optional[int] = None) -> str:
+        """Generate multiple video segments concurrently and concatenate them in order
+        
+        Completed segments are checkpointed in a job manifest, so rerunning the same
+        script after a failure or crash only renders the segments that are missing.
+        """
         segments = script_data.get('segments', [script_data])  # Fallback for single segment
-        segment_paths = []
+        max_concurrent = max(1, max_concurrent or self.max_concurrent_segments)
         
-        os.makedirs('temp_segments', exist_ok=True)
+        # Normalize, encode and host the reference images once for all segments
+        images = self.prepare_reference_images(image_paths)
+        image_urls = self._reference_urls(images)
         
+        # Prepare every segment up front - continuity notes only depend on the script,
+        # so no segment has to wait for the previous one to finish rendering
+        render_jobs = []
         for i, segment in enumerate(segments):
             segment_num = i + 1
-            job_status['progress'] = f'Creating segment {segment_num}/{len(segments)}...'
-            logger.info(f"Generating segment {segment_num}/{len(segments)}")
             
             # Prepare segment data in the format expected by generate_video
             segment_data = {
@@ -638,23 +657,73 @@ Be specific and detailed in your description."""
             if i > 0 and 'continuity_note' in segments[i-1]:
                 segment_data['visual_prompts'][0] = f"Continuing from previous scene: {segments[i-1]['continuity_note']}. {segment_data['visual_prompts'][0]}"
             
-            # Generate this segment (use same images for all segments to maintain style)
-            segment_path = self.generate_video(segment_data, image_paths)
+            # Use same images for all segments to maintain style
+            arguments = self._build_video_arguments(segment_data, images, image_urls)
+            prompt_hash = self._render_key(arguments, images, image_urls)
+            render_jobs.append({
+                'endpoint': self.veo_endpoint,
+                'arguments': arguments,
+                'label': f"Veo3 (Segment {segment_num})",
+                'prompt_hash': prompt_hash,
+                'cache_key': prompt_hash
+            })
+        
+        # The job directory is derived from the segment prompts, so a retry of the
+        # same script finds the manifest and segments from the previous attempt
+        job_key = SegmentManifest.job_key([job['prompt_hash'] for job in render_jobs])
+        manifest = SegmentManifest.open_job('temp_segments', job_key)
+        try:
+            return self._render_segment_job(render_jobs, manifest, job_status, max_concurrent)
+        finally:
+            # No-op after clear(); on failure the segments stay for the retry
+            manifest.release()
+    
+    def _render_segment_job(self, render_jobs: List[Dict], manifest: SegmentManifest, job_status: Dict, max_concurrent: int) -> str:
+        """Render the segments the manifest is missing, then produce the final video"""
+        segment_paths = []
+        pending = []
+        job_status['segments'] = []
+        for i, job in enumerate(render_jobs):
+            segment_num = i + 1
+            job['output_path'] = os.path.join(manifest.job_dir, f"segment_{segment_num:03d}.mp4")
+            segment_paths.append(job['output_path'])
             
-            # Move to temp directory with proper naming
-            temp_segment_path = f"temp_segments/segment_{segment_num:03d}.mp4"
-            os.rename(segment_path, temp_segment_path)
-            segment_paths.append(temp_segment_path)
+            if manifest.completed_path(segment_num, job['prompt_hash']):
+                logger.info(f"Segment {segment_num}/{len(render_jobs)} already rendered, reusing checkpoint")
+                job_status['segments'].append({'segment': segment_num, 'status': 'completed'})
+            else:
+                job_status['segments'].append({'segment': segment_num, 'status': 'queued'})
+                pending.append(i)
+        
+        def on_update(pending_index: int, status: str):
+            index = pending[pending_index]
+            if status == 'completed':
+                manifest.record(index + 1, render_jobs[index]['output_path'], render_jobs[index]['prompt_hash'])
+            job_status['segments'][index]['status'] = status
+            completed = sum(1 for segment in job_status['segments'] if segment['status'] == 'completed')
+            if status == 'completed':
+                job_status['progress'] = f'Rendered {completed}/{len(render_jobs)} segments...'
+            logger.info(f"Segment {index + 1}/{len(render_jobs)}: {status}")
+        
+        if pending:
+            resumed = len(render_jobs) - len(pending)
+            job_status['progress'] = f'Rendering {len(pending)} segments ({min(max_concurrent, len(pending))} at a time)...'
+            if resumed:
+                job_status['progress'] = f'Resuming: {resumed}/{len(render_jobs)} segments already rendered, rendering {len(pending)} more...'
+            get_render_engine().render_many_sync([render_jobs[i] for i in pending], max_concurrent, on_update)
         
         # If only one segment, just return it
         if len(segment_paths) == 1:
             final_path = f"output/video_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
             os.rename(segment_paths[0], final_path)
+            manifest.clear()
             return final_path
         
-        # Concatenate segments using ffmpeg
+        # Concatenate segments using ffmpeg - segment_paths keeps script order
         job_status['progress'] = 'Combining segments into final video...'
-        return self.concatenate_videos(segment_paths)
+        output_path = self.concatenate_videos(segment_paths)
+        manifest.clear()
+        return output_path
     
     def concatenate_videos(self, video_paths: List[str]) -> str:
         """Concatenate multiple video files using ffmpeg"""
@@ -687,11 +756,13 @@ Be specific and detailed in your description."""
             logger.error(f"FFmpeg error: {e.stderr}")
             raise Exception(f"Failed to concatenate videos: {e.stderr}")
         finally:
-            # Cleanup
             os.unlink(concat_file)
-            for path in video_paths:
-                if os.path.exists(path):
-                    os.unlink(path)
+        
+        # Only remove the inputs once the final video exists, so a failed
+        # concatenation can be retried without re-rendering the segments
+        for path in video_paths:
+            if os.path.exists(path):
+                os.unlink(path)
         
         return output_path
         
@@ -712,15 +783,16 @@ Be specific and detailed in your description."""
             }
         }
         
-        media = MediaFileUpload(video_path, chunksize=-1, resumable=True)
-        
-        request = self.youtube.videos().insert(
-            part='snippet,status',
-            body=body,
-            media_body=media
-        )
+        media = load_media_file_upload()(video_path, chunksize=-1, resumable=True)
         
-        response = request.execute()
+        with self._youtube_lock:
+            request = self.youtube.videos().insert(
+                part='snippet,status',
+                body=body,
+                media_body=media
+            )
+            
+            response = request.execute()
         video_id = response['id']
         video_url = f"https://youtube.com/watch?v={video_id}"
         
@@ -730,10 +802,10 @@ Be specific and detailed in your description."""
     def update_sheets(self, topic_data: Dict, video_url: str, script_data: Dict):
         """Update Google Sheets with published video info"""
         # Update topic status
-        self.topics_sheet.update_cell(topic_data['row'], 2, 'Published')  # Assuming Status is column B
+        self.storage.set_topic_status(topic_data, 'Published')
         
         # Add to published videos
-        self.videos_sheet.append_row([
+        self.storage.add_published([
             topic_data['id'],
             topic_data['topic'],
             script_data['title'],
@@ -741,6 +813,9 @@ Be specific and detailed in your description."""
             datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             0  # Initial view count
         ])
+        # One batch update plus one append, sent when the job is done
+        # A failed flush stays queued rather than marking a published video as Error
+        self.storage.flush(raise_errors=False)
         
     def process_video(self):
         """Main workflow: Topic → Script → Video → Upload"""
@@ -754,7 +829,7 @@ Be specific and detailed in your description."""
             logger.info(f"Processing topic: {topic_data['topic']}")
             
             # Update status to Processing
-            self.topics_sheet.update_cell(topic_data['row'], 2, 'Processing')
+            self.storage.set_topic_status(topic_data, 'Processing')
             
             # Generate script
             script_data = self.generate_script(topic_data['topic'])
@@ -774,7 +849,8 @@ Be specific and detailed in your description."""
             logger.error(f"Error processing video: {str(e)}")
             # Update status back to Pending on error
             if 'topic_data' in locals():
-                self.topics_sheet.update_cell(topic_data['row'], 2, 'Error')
+                self.storage.set_topic_status(topic_data, 'Error')
+                self.storage.flush()
             raise
 
 def main():
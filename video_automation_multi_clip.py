@@ -10,16 +10,16 @@ import time
 import subprocess
 from datetime import datetime
 from typing import Dict, List, Optional
-import gspread
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-import requests
+from integrations import (
+    load_auth_request, load_discovery_build, load_gspread, load_installed_app_flow,
+    load_media_file_upload, load_oauth_credentials, load_service_account_credentials
+)
+from grok_client import get_grok_client
 from loguru import logger
 from dotenv import load_dotenv
-import fal_client
+from render_engine import get_render_engine
+from storage import Storage, create_storage, sheets_mirror_enabled, storage_backend
+from script_schema import MULTI_SCENE_SCRIPT_SCHEMA, invalid_fields, parse_script_json, response_format
 
 # Load environment variables
 load_dotenv()
@@ -29,18 +29,35 @@ logger.add("logs/video_automation_{time}.log", rotation="1 day", retention="7 da
 
 class MultiClipVideoAutomation:
     def __init__(self):
-        self.setup_google_sheets()
+        self.setup_storage()
         self.setup_youtube()
         self.grok_api_key = os.getenv('GROK_API_KEY')
         self.grok_api_url = os.getenv('GROK_API_URL')
-        
+        # Same toggle as VideoAutomation: ask Grok for schema-conforming JSON
+        self.structured_output = os.getenv('GROK_STRUCTURED_OUTPUT', 'true').lower() == 'true'
+        
+    def setup_storage(self):
+        """Open the STORAGE_BACKEND store - Google Sheets, or SQLite with an optional Sheets mirror"""
+        self.spreadsheet = None
+        self.topics_sheet = None
+        self.videos_sheet = None
+        if storage_backend() == 'sheets' or sheets_mirror_enabled():
+            try:
+                self.setup_google_sheets()
+            except Exception as e:
+                if storage_backend() == 'sheets':
+                    raise
+                logger.warning(f"Google Sheets unavailable, SQLite runs without its mirror: {e}")
+        self.storage: Storage = create_storage(self.spreadsheet, self.topics_sheet, self.videos_sheet)
+
     def setup_google_sheets(self):
         """Initialize Google Sheets connection"""
-        creds = Credentials.from_service_account_file(
+        # Sheets libraries load here, not at import - most web requests never need them
+        creds = load_service_account_credentials().from_service_account_file(
             os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH'),
             scopes=['https://www.googleapis.com/auth/spreadsheets']
         )
-        self.gc = gspread.authorize(creds)
+        self.gc = load_gspread().authorize(creds)
         self.spreadsheet = self.gc.open_by_key(os.getenv('SPREADSHEET_ID'))
         self.topics_sheet = self.spreadsheet.worksheet('Topics')
         self.videos_sheet = self.spreadsheet.worksheet('Published')
@@ -54,29 +71,24 @@ class MultiClipVideoAutomation:
         if os.path.exists(token_path):
             with open(token_path, 'r') as token:
                 creds_data = json.load(token)
-                from google.oauth2.credentials import Credentials as OAuthCredentials
-                creds = OAuthCredentials.from_authorized_user_info(creds_data, SCOPES)
+                creds = load_oauth_credentials().from_authorized_user_info(creds_data, SCOPES)
         
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
+                creds.refresh(load_auth_request()())
             else:
-                flow = InstalledAppFlow.from_client_secrets_file(
+                flow = load_installed_app_flow().from_client_secrets_file(
                     os.getenv('YOUTUBE_CLIENT_SECRETS_PATH'), SCOPES)
                 creds = flow.run_local_server(port=0)
             
             with open(token_path, 'w') as token:
                 token.write(creds.to_json())
         
-        self.youtube = build('youtube', 'v3', credentials=creds)
+        self.youtube = load_discovery_build()('youtube', 'v3', credentials=creds)
         
     def get_next_topic(self) -> Optional[Dict]:
         """Get next unprocessed topic from Google Sheets"""
-        all_records = self.topics_sheet.get_all_records()
-        for idx, record in enumerate(all_records, start=2):
-            if record.get('Status') != 'Published':
-                return {'row': idx, 'topic': record.get('Topic'), 'id': record.get('ID')}
-        return None
+        return self.storage.next_topic()
         
     def generate_multi_scene_script(self, topic: str) -> Dict:
         """Generate script with multiple 8-second scenes for a 30-second video"""
@@ -106,43 +118,39 @@ class MultiClipVideoAutomation:
             'messages': [{'role': 'user', 'content': prompt}],
             'temperature': 0.7
         }
+        if self.structured_output:
+            data['response_format'] = response_format(MULTI_SCENE_SCRIPT_SCHEMA, 'multi_scene_script')
         
-        response = requests.post(self.grok_api_url, headers=headers, json=data)
+        response = get_grok_client().post_structured(self.grok_api_url, headers=headers, json=data)
         response.raise_for_status()
         
         content = response.json()['choices'][0]['message']['content']
-        return json.loads(content)
+        script_data = parse_script_json(content)
+        missing = invalid_fields(script_data, MULTI_SCENE_SCRIPT_SCHEMA)
+        if missing:
+            raise ValueError(f"Grok returned an incomplete scene script, missing: {missing}")
+        return script_data
         
     def generate_video_clip(self, scene_data: Dict, scene_number: int) -> str:
         """Generate a single 8-second video clip"""
         logger.info(f"Generating video clip {scene_number}")
         
-        def on_queue_update(update):
-            if isinstance(update, fal_client.InProgress):
-                for log in update.logs:
-                    logger.info(f"Veo3 Progress (Scene {scene_number}): {log['message']}")
-        
         # Add scene context to prompt
         prompt = f"Scene {scene_number} of 4, vertical 9:16 format: {scene_data['visual_prompt']}"
         
-        result = fal_client.subscribe(
+        clip_path = f"output/clip_{scene_number}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
+        
+        # The render engine submits, polls and downloads on its shared event loop
+        get_render_engine().render_sync(
             "fal-ai/veo3/fast",
-            arguments={
+            {
                 "prompt": prompt,
                 "aspect_ratio": "9:16",
                 "duration": "8s"
             },
-            with_logs=True,
-            on_queue_update=on_queue_update
+            clip_path,
+            label=f"Veo3 (Scene {scene_number})"
         )
-        
-        # Download video clip
-        video_url = result.get('video', {}).get('url') or result.get('url') or result.get('video_url')
-        clip_path = f"output/clip_{scene_number}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-        
-        response = requests.get(video_url)
-        with open(clip_path, 'wb') as f:
-            f.write(response.content)
             
         logger.info(f"Clip {scene_number} saved to: {clip_path}")
         return clip_path
@@ -201,7 +209,7 @@ class MultiClipVideoAutomation:
             }
         }
         
-        media = MediaFileUpload(video_path, chunksize=-1, resumable=True)
+        media = load_media_file_upload()(video_path, chunksize=-1, resumable=True)
         
         request = self.youtube.videos().insert(
             part='snippet,status',
@@ -218,9 +226,9 @@ class MultiClipVideoAutomation:
         
     def update_sheets(self, topic_data: Dict, video_url: str, script_data: Dict):
         """Update Google Sheets with published video info"""
-        self.topics_sheet.update_cell(topic_data['row'], 2, 'Published')
+        self.storage.set_topic_status(topic_data, 'Published')
         
-        self.videos_sheet.append_row([
+        self.storage.add_published([
             topic_data['id'],
             topic_data['topic'],
             script_data['title'],
@@ -228,6 +236,7 @@ class MultiClipVideoAutomation:
             datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             0
         ])
+        self.storage.flush(raise_errors=False)
         
     def process_video(self):
         """Main workflow: Topic → Multi-Scene Script → Multiple Clips → Stitch → Upload"""
@@ -241,7 +250,7 @@ class MultiClipVideoAutomation:
             logger.info(f"Processing topic: {topic_data['topic']}")
             
             # Update status to Processing
-            self.topics_sheet.update_cell(topic_data['row'], 2, 'Processing')
+            self.storage.set_topic_status(topic_data, 'Processing')
             
             # Generate multi-scene script
             script_data = self.generate_multi_scene_script(topic_data['topic'])
@@ -267,7 +276,8 @@ class MultiClipVideoAutomation:
         except Exception as e:
             logger.error(f"Error processing video: {str(e)}")
             if 'topic_data' in locals():
-                self.topics_sheet.update_cell(topic_data['row'], 2, 'Error')
+                self.storage.set_topic_status(topic_data, 'Error')
+                self.storage.flush()
             raise
 
 def main():